@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+import threading
+
+from app.utils import write_atomic
+
+
+class AnimationCache:
+    """Dyskowa pamięć podręczna gotowych animacji z usuwaniem najdawniej używanych (LRU) ponad limit bajtów."""
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(**params):
+        # Parametry muszą obejmować najnowszy image_hash zakresu - nowa klatka zmienia klucz.
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def get(self, key, ext="gif"):
+        path = self._path(key, ext)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, data, ext="gif"):
+        path = self._path(key, ext)
+        write_atomic(path, data)
+        self.evict()
+        return path
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.root):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -1,80 +1,195 @@
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from typing import Any, NamedTuple
 
 load_dotenv()
 
-class NOAADataFetcher:
-    def __init__(self, url="https://services.swpc.noaa.gov/json/rtsw/rtsw_wind_1m.json"):
-        self.url = url
+_shared_session = None
+_shared_session_lock = threading.Lock()
 
-    def fetch_data(self):
-        resp = requests.get(self.url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        return data
 
-class XRayDataFetcher:
-    def __init__(self, url="https://services.swpc.noaa.gov/json/goes/primary/xray-flares-latest.json"):
-        self.url = url
+def create_session(pool_maxsize=16):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
-    def fetch_data(self):
-        resp = requests.get(self.url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        return data
 
+def get_shared_session():
+    """Wspólna sesja HTTP (keep-alive) dla wszystkich fetcherów w procesie."""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
 
-class GOESPrimaryFetcher:
-    def __init__(self, url="https://services.swpc.noaa.gov/json/goes/primary/xrays-1-day.json"):
-        self.url = url
 
-    def fetch_data(self):
-        response = requests.get(self.url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        return data
+class FetchResult(NamedTuple):
+    value: Any = None
+    error: Exception = None
+
+
+def fetch_concurrently(tasks, deadline=30):
+    """Wykonuje zadania {nazwa: funkcja} równolegle i zwraca {nazwa: FetchResult}."""
+    if not tasks:
+        return {}
+
+    executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="fetch")
+    futures = {name: executor.submit(task) for name, task in tasks.items()}
+    wait(futures.values(), timeout=deadline)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    for name, future in futures.items():
+        if not future.done():
+            results[name] = FetchResult(error=TimeoutError(f"{name}: przekroczono limit {deadline} s"))
+        elif future.exception() is not None:
+            results[name] = FetchResult(error=future.exception())
+        else:
+            results[name] = FetchResult(value=future.result())
+    return results
+
+
+class HTTPValidators:
+    """Zapamiętane ETag / Last-Modified dla każdego adresu URL.
+
+    Walidatory z odpowiedzi czekają jako oczekujące, aż wywołujący zapisze dane (commit).
+    Bez tego błąd zapisu po udanym pobraniu dawałby 304 przy kolejnej próbie i gubił zmianę.
+    """
+
+    def __init__(self):
+        self._by_url = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def request_headers(self, url):
+        with self._lock:
+            etag, last_modified = self._by_url.get(url, (None, None))
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def stage(self, url, response):
+        with self._lock:
+            self._pending[url] = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
 
-class GOESSecondaryFetcher:
-    def __init__(self, url="https://services.swpc.noaa.gov/json/goes/secondary/xrays-1-day.json"):
+    def commit(self, url):
+        """Dane z ostatniej odpowiedzi zostały zapisane - kolejne żądania mogą być warunkowe."""
+        with self._lock:
+            if url not in self._pending:
+                return
+            etag, last_modified = self._pending.pop(url)
+            if etag or last_modified:
+                self._by_url[url] = (etag, last_modified)
+            else:
+                self._by_url.pop(url, None)
+
+
+def conditional_get(session, url, validators, timeout=10):
+    """GET z nagłówkami warunkowymi; zwraca None, gdy serwer odpowie 304 Not Modified.
+
+    Walidatory odpowiedzi trzeba zatwierdzić (validators.commit) po zapisaniu danych.
+    """
+    response = session.get(url, headers=validators.request_headers(url), timeout=timeout)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    validators.stage(url, response)
+    return response
+
+
+class JSONFeedFetcher:
+    def __init__(self, url, session=None, timeout=10):
         self.url = url
+        self.session = session if session is not None else get_shared_session()
+        self.timeout = timeout
+        self.validators = HTTPValidators()
 
     def fetch_data(self):
-        """Pobiera dane GOES Secondary."""
-        response = requests.get(self.url, timeout=10)
-        response.raise_for_status()
+        response = conditional_get(self.session, self.url, self.validators, self.timeout)
+        if response is None:
+            return None
         data = response.json()
         return data
 
+    def commit(self):
+        """Wywoływane po zapisaniu danych z ostatniego fetch_data."""
+        self.validators.commit(self.url)
+
+
+class NOAADataFetcher(JSONFeedFetcher):
+    def __init__(self, url="https://services.swpc.noaa.gov/json/rtsw/rtsw_wind_1m.json", session=None):
+        super().__init__(url, session)
+
+
+class XRayDataFetcher(JSONFeedFetcher):
+    def __init__(self, url="https://services.swpc.noaa.gov/json/goes/primary/xray-flares-latest.json", session=None):
+        super().__init__(url, session)
+
+
+class GOESPrimaryFetcher(JSONFeedFetcher):
+    def __init__(self, url="https://services.swpc.noaa.gov/json/goes/primary/xrays-1-day.json", session=None):
+        super().__init__(url, session)
+
+
+class GOESSecondaryFetcher(JSONFeedFetcher):
+    """Pobiera dane GOES Secondary."""
+
+    def __init__(self, url="https://services.swpc.noaa.gov/json/goes/secondary/xrays-1-day.json", session=None):
+        super().__init__(url, session)
+
+
 class SolarImageFetcher:
-    def __init__(self):
+    def __init__(self, session=None, timeout=10, deadline=30):
         self.image_sources = {
             "SOHO LASCO C2": "https://soho.nascom.nasa.gov/data/realtime/c2/1024/latest.jpg",
             "SOHO LASCO C3": "https://soho.nascom.nasa.gov/data/realtime/c3/1024/latest.jpg",
             "SDO HMI Continuum": "https://soho.nascom.nasa.gov/data/realtime/hmi_igr/1024/latest.jpg"
         }
+        self.session = session if session is not None else get_shared_session()
+        self.timeout = timeout
+        self.deadline = deadline
+        self.validators = HTTPValidators()
+
+    def commit(self, source_name):
+        """Wywoływane po zapisaniu obrazu źródła (albo stwierdzeniu, że już jest w bazie)."""
+        self.validators.commit(self.image_sources[source_name])
 
     @staticmethod
     def calculate_image_hash(image_data):
         return hashlib.sha256(image_data).hexdigest()
 
+    def fetch_image(self, source_name, url):
+        response = conditional_get(self.session, url, self.validators, self.timeout)
+        if response is None:
+            return None
+        image_data = response.content
+        return {
+            "source": source_name,
+            "image_data": image_data,
+            "image_hash": self.calculate_image_hash(image_data),
+            "time_tag": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
     def fetch_images(self):
+        results = fetch_concurrently({
+            source_name: (lambda source_name=source_name, url=url: self.fetch_image(source_name, url))
+            for source_name, url in self.image_sources.items()
+        }, deadline=self.deadline)
+
         images = []
-        for source_name, url in self.image_sources.items():
-            try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                image_data = response.content
-                image_hash = self.calculate_image_hash(image_data)
-                time_tag = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                images.append({
-                    "source": source_name,
-                    "image_data": image_data,
-                    "image_hash": image_hash,
-                    "time_tag": time_tag
-                })
-            except Exception as e:
-                print(f"Błąd pobierania obrazu z {source_name}: {e}")
+        for source_name, result in results.items():
+            if result.error is not None:
+                print(f"Błąd pobierania obrazu z {source_name}: {result.error}")
+            elif result.value is not None:
+                images.append(result.value)
         return images
@@ -1,76 +1,375 @@
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import partial
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.image_store import ImageStore
+from app.utils import time_tag_epoch
+
+
+class ConnectionPool:
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-32000",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, db_name, max_idle=8, cached_statements=256):
+        self.db_name = db_name
+        self.cached_statements = cached_statements
+        self.schema_ready = False
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    @classmethod
+    def for_database(cls, db_name):
+        key = os.path.abspath(db_name)
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls(db_name)
+                cls._pools[key] = pool
+            return pool
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_name,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# Agregaty (min/max/średnia/liczba próbek) utrzymywane dla kubełków 5 min, 1 h i 1 doba.
+ROLLUP_RESOLUTIONS = (300, 3600, 86400)
+
+# tabela źródłowa -> (tabela agregatów, mierzone kolumny, dodatkowe klucze grupowania)
+ROLLUP_TABLES = {
+    "solarwind": ("solarwind_rollup", ("proton_speed", "proton_density", "proton_temperature"), ()),
+    "goes_data": ("goes_rollup", ("flux_long", "flux_short"), ("satellite",)),
+}
+
+# Agregaty GOES sprzed przejścia na szeroki wiersz (jedno pasmo w kolumnie flux) - dla starszych migracji.
+LEGACY_GOES_ROLLUP = ("goes_rollup", ("flux",), ("satellite",))
+
+# Pasma energii GOES XRS: wartość pola "energy" z NOAA -> przyrostek kolumn w goes_data.
+GOES_BANDS = {"0.05-0.4nm": "short", "0.1-0.8nm": "long"}
+GOES_BAND_MEASURES = ("flux", "observed_flux", "electron_correction", "electron_contamination")
+
+
+def _rollup_create_sql(table, spec=None):
+    rollup_table, measures, keys = spec or ROLLUP_TABLES[table]
+    key_columns = "".join(f"{key} INTEGER NOT NULL, " for key in keys)
+    measure_columns = "".join(f"{m}_min REAL, {m}_max REAL, {m}_mean REAL, " for m in measures)
+    primary_key = ", ".join(("resolution", "bucket") + keys)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {rollup_table} ("
+        f"resolution INTEGER NOT NULL, bucket INTEGER NOT NULL, {key_columns}{measure_columns}"
+        f"sample_count INTEGER NOT NULL, PRIMARY KEY ({primary_key})) WITHOUT ROWID"
+    )
+
+
+def _rollup_refresh_sql(table, resolution, where="", time_expr="time_epoch", spec=None):
+    rollup_table, measures, keys = spec or ROLLUP_TABLES[table]
+    key_list = "".join(f", {key}" for key in keys)
+    targets = "".join(f", {m}_min, {m}_max, {m}_mean" for m in measures)
+    aggregates = "".join(f", MIN({m}), MAX({m}), AVG({m})" for m in measures)
+    bucket = f"{time_expr} / {resolution} * {resolution}"
+    return (
+        f"INSERT OR REPLACE INTO {rollup_table} (resolution, bucket{key_list}{targets}, sample_count) "
+        f"SELECT {resolution}, {bucket} AS rollup_bucket{key_list}{aggregates}, COUNT(*) "
+        f"FROM {table} {where} GROUP BY rollup_bucket{key_list}"
+    )
+
+
+# Czas jako sekundy od epoki (UTC) wyliczone z tekstowego time_tag; strftime rozumie oba używane formaty.
+TIME_EPOCH_SQL = "CAST(strftime('%s', time_tag) AS INTEGER)"
+TIME_EPOCH_TABLES = ("xray", "solarwind", "goes_data", "solar_images")
+
+
+def _goes_band_columns():
+    return tuple(f"{measure}_{band}" for band in GOES_BANDS.values() for measure in GOES_BAND_MEASURES)
+
+
+def _goes_data_create_sql(table="goes_data"):
+    """Tabela goes_data: jeden wiersz na (czas, satelita) z kolumnami obu pasm energii."""
+    band_columns = "".join(
+        f"{column} {'INTEGER' if column.startswith('electron_contamination') else 'REAL'}, "
+        for column in _goes_band_columns()
+    )
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table} ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, time_tag TEXT NOT NULL, satellite INTEGER, "
+        f"{band_columns}UNIQUE(time_tag, satellite))"
+    )
+
+
+def _when_goes_data_is_narrow(*statements):
+    """Krok migracji dla starej goes_data (wiersz na pasmo, kolumna energy); nowe bazy mają od razu szeroką."""
+    def run(c):
+        if any(column[1] == "energy" for column in c.execute("PRAGMA table_info(goes_data)")):
+            for sql in statements:
+                c.execute(sql)
+    return run
+
+
+def _goes_wide_migration_sql():
+    """Przebudowa goes_data: dwa wiersze (po jednym na pasmo) -> jeden wiersz z kolumnami obu pasm."""
+    pivot = ", ".join(
+        f"MAX(CASE WHEN energy = '{energy}' THEN {measure} END)"
+        for energy in GOES_BANDS for measure in GOES_BAND_MEASURES
+    )
+    return (
+        _when_goes_data_is_narrow(
+            _goes_data_create_sql("goes_data_wide"),
+            "ALTER TABLE goes_data_wide ADD COLUMN time_epoch INTEGER",
+            f"INSERT INTO goes_data_wide (time_tag, satellite, time_epoch, {', '.join(_goes_band_columns())}) "
+            f"SELECT time_tag, satellite, MIN(time_epoch), {pivot} "
+            "FROM goes_data GROUP BY time_tag, satellite ORDER BY MIN(id)",
+            "DROP TABLE goes_data",
+            "ALTER TABLE goes_data_wide RENAME TO goes_data",
+            "CREATE INDEX IF NOT EXISTS idx_goes_data_time_epoch ON goes_data (time_epoch, satellite)",
+        ),
+        # Znaczniki ingestii GOES są teraz per pasmo; pierwsze odpytanie uzupełni pominięte wcześniej pasma.
+        "DELETE FROM ingest_marks WHERE feed = 'goes_data'",
+        "DROP TABLE IF EXISTS goes_rollup",
+        _rollup_create_sql("goes_data"),
+        *(_rollup_refresh_sql("goes_data", resolution) for resolution in ROLLUP_RESOLUTIONS),
+    )
+
 
 class DBManager:
-    def __init__(self, db_name="space_weather.db"):
+    # Wiersz goes_data: czas, satelita i dla każdego pasma (short 0.05-0.4 nm, long 0.1-0.8 nm)
+    # flux, observed_flux, electron_correction, electron_contamination.
+    GOES_DATA_COLUMNS = ("time_tag", "satellite") + _goes_band_columns()
+
+    # Odczyt kolumnowy: typy tablic NumPy i liczba wierszy pobieranych z kursora naraz.
+    SOLARWIND_COLUMNS_DTYPE = np.dtype([
+        ("time_epoch", np.int64), ("proton_speed", np.float32), ("proton_density", np.float32),
+        ("proton_temperature", np.float32)
+    ])
+    GOES_FLUX_COLUMNS_DTYPE = np.dtype([
+        ("time_epoch", np.int64), ("satellite", np.int8), ("flux", np.float32), ("flux_short", np.float32),
+    ])
+    COLUMNAR_CHUNK_ROWS = 65536
+
+    # Tabele dostępne w podglądzie bazy - nazwa trafia do SQL, więc tylko z tej listy.
+    BROWSABLE_TABLES = ("xray", "solarwind", "solar_images", "goes_data")
+
+    # Tabele, których zapisy podbijają wersję w data_version (klucz pamięci podręcznej zapytań).
+    VERSIONED_TABLES = ("xray", "solarwind", "goes_data", "solar_images")
+
+    # Kolejne kroki migracji schematu; numer wersji = pozycja na liście (PRAGMA user_version).
+    # Krok to SQL albo funkcja wywoływana z kursorem (migracje zależne od stanu bazy).
+    MIGRATIONS = (
+        (
+            "ALTER TABLE solarwind ADD COLUMN source TEXT",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_solarwind_time_tag_source ON solarwind (time_tag, source)",
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS idx_xray_time_tag ON xray (time_tag)",
+            "CREATE INDEX IF NOT EXISTS idx_solar_images_source_time_tag ON solar_images (source, time_tag)",
+        ),
+        (
+            _rollup_create_sql("solarwind"),
+            *(_rollup_refresh_sql("solarwind", resolution, time_expr=TIME_EPOCH_SQL)
+              for resolution in ROLLUP_RESOLUTIONS),
+            _when_goes_data_is_narrow(
+                _rollup_create_sql("goes_data", LEGACY_GOES_ROLLUP),
+                *(_rollup_refresh_sql("goes_data", resolution, time_expr=TIME_EPOCH_SQL, spec=LEGACY_GOES_ROLLUP)
+                  for resolution in ROLLUP_RESOLUTIONS),
+            ),
+        ),
+        (
+            # Obrazy trafiają do ImageStore; w tabeli zostaje pusty BLOB i ścieżka pliku.
+            "ALTER TABLE solar_images ADD COLUMN path TEXT",
+        ),
+        (
+            # Liczbowy czas (sekundy UTC) - zakresy i sortowanie bez porównywania tekstów.
+            *(f"ALTER TABLE {table} ADD COLUMN time_epoch INTEGER" for table in TIME_EPOCH_TABLES),
+            *(f"UPDATE {table} SET time_epoch = {TIME_EPOCH_SQL}" for table in TIME_EPOCH_TABLES),
+            "CREATE INDEX IF NOT EXISTS idx_xray_time_epoch ON xray (time_epoch)",
+            "CREATE INDEX IF NOT EXISTS idx_solarwind_time_epoch_source ON solarwind (time_epoch, source)",
+            "CREATE INDEX IF NOT EXISTS idx_goes_data_time_epoch ON goes_data (time_epoch, satellite)",
+            "CREATE INDEX IF NOT EXISTS idx_solar_images_source_time_epoch ON solar_images (source, time_epoch)",
+            "DROP INDEX IF EXISTS idx_solar_images_source_time_tag",
+        ),
+        # Oba pasma energii GOES w jednym wierszu (wcześniej UNIQUE(time_tag, satellite) odrzucało drugie).
+        _goes_wide_migration_sql(),
+        (
+            # Usuwa minuty wiatru słonecznego zapisane drugi raz (ze źródłem) obok wierszy sprzed kolumny source.
+            """
+            DELETE FROM solarwind
+            WHERE source IS NOT NULL
+              AND EXISTS (SELECT 1 FROM solarwind AS legacy
+                          WHERE legacy.time_tag = solarwind.time_tag AND legacy.source IS NULL)
+            """,
+            "DELETE FROM solarwind_rollup",
+            *(_rollup_refresh_sql("solarwind", resolution) for resolution in ROLLUP_RESOLUTIONS),
+        ),
+    )
+
+    def __init__(self, db_name="space_weather.db", image_dir=None):
         self.db_name = db_name
-        self._create_tables()
+        if image_dir is None:
+            image_dir = os.path.join(os.path.dirname(os.path.abspath(db_name)), "solar_images")
+        self.image_store = ImageStore(image_dir)
+        self.pool = ConnectionPool.for_database(db_name)
+        if not self.pool.schema_ready:
+            self._create_tables()
+            self.pool.schema_ready = True
+
+    @contextmanager
+    def _transaction(self):
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn.cursor()
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _fetchall(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _fetchone(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def close(self):
+        self.pool.close_all()
 
     def _create_tables(self):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS xray (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                time_tag TEXT NOT NULL,
-                satellite INTEGER,
-                current_class TEXT,
-                current_ratio REAL,
-                current_int_xrlong REAL,
-                begin_time TEXT,
-                begin_class TEXT,
-                max_time TEXT,
-                max_class TEXT,
-                max_xrlong REAL,
-                end_time TEXT,
-                end_class TEXT
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS solarwind (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                time_tag TEXT NOT NULL,
-                proton_speed REAL,
-                proton_density REAL,
-                proton_temperature INTEGER
-            )
-        ''')
-
-        c.execute('''
-                   CREATE TABLE IF NOT EXISTS goes_data (
-                       id INTEGER PRIMARY KEY AUTOINCREMENT,
-                       time_tag TEXT NOT NULL,
-                       satellite INTEGER,
-                       flux REAL,
-                       observed_flux REAL,
-                       electron_correction REAL,
-                       electron_contamination BOOLEAN,
-                       energy TEXT,
-                       UNIQUE(time_tag, satellite)  
-                   )
-               ''')
-
-        c.execute('''
-                CREATE TABLE IF NOT EXISTS solar_images (
+        with self._transaction() as c:
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS xray (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    source TEXT NOT NULL,       
-                    image BLOB NOT NULL,        
-                    image_hash TEXT NOT NULL,   
-                    time_tag TEXT NOT NULL,     
-                    UNIQUE(source, image_hash)  
+                    time_tag TEXT NOT NULL,
+                    satellite INTEGER,
+                    current_class TEXT,
+                    current_ratio REAL,
+                    current_int_xrlong REAL,
+                    begin_time TEXT,
+                    begin_class TEXT,
+                    max_time TEXT,
+                    max_class TEXT,
+                    max_xrlong REAL,
+                    end_time TEXT,
+                    end_class TEXT
                 )
             ''')
 
-        conn.commit()
-        conn.close()
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS solarwind (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    time_tag TEXT NOT NULL,
+                    proton_speed REAL,
+                    proton_density REAL,
+                    proton_temperature INTEGER
+                )
+            ''')
+
+            c.execute(_goes_data_create_sql())
+
+            c.execute('''
+                    CREATE TABLE IF NOT EXISTS solar_images (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        source TEXT NOT NULL,       
+                        image BLOB NOT NULL,        
+                        image_hash TEXT NOT NULL,   
+                        time_tag TEXT NOT NULL,     
+                        UNIQUE(source, image_hash)
+                    )
+                ''')
+
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_marks (
+                    feed TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    time_tag TEXT NOT NULL,
+                    PRIMARY KEY (feed, source)
+                )
+            ''')
+
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS data_version (
+                    table_name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            ''')
+
+            self._migrate(c)
+
+    def _migrate(self, c):
+        version = c.execute("PRAGMA user_version").fetchone()[0]
+        for target, statements in enumerate(self.MIGRATIONS, start=1):
+            if version >= target:
+                continue
+            for sql in statements:
+                if callable(sql):
+                    sql(c)
+                else:
+                    c.execute(sql)
+            c.execute(f"PRAGMA user_version = {target}")
 
     def insert_xray(self, time_tag, satellite, current_class, current_ratio, current_int_xrlong,
                     begin_time, begin_class, max_time, max_class, max_xrlong, end_time, end_class):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO xray (
+        with self._transaction() as c:
+            c.execute("""
+                INSERT INTO xray (
+                    time_tag,
+                    satellite,
+                    current_class,
+                    current_ratio,
+                    current_int_xrlong,
+                    begin_time,
+                    begin_class,
+                    max_time,
+                    max_class,
+                    max_xrlong,
+                    end_time,
+                    end_class,
+                    time_epoch
+                ) VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, ?12, CAST(strftime('%s', ?1) AS INTEGER))
+            """, (
                 time_tag,
                 satellite,
                 current_class,
@@ -83,202 +382,501 @@ class DBManager:
                 max_xrlong,
                 end_time,
                 end_class
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            time_tag,
-            satellite,
-            current_class,
-            current_ratio,
-            current_int_xrlong,
-            begin_time,
-            begin_class,
-            max_time,
-            max_class,
-            max_xrlong,
-            end_time,
-            end_class
-        ))
-        conn.commit()
-        conn.close()
+            ))
+            self._bump_data_version(c, "xray")
 
     def check_xray_exists(self, time_tag):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM xray WHERE time_tag = ?", (time_tag,))
-        row = c.fetchone()
-        conn.close()
+        row = self._fetchone("SELECT 1 FROM xray WHERE time_tag = ?", (time_tag,))
         return (row is not None)
 
     def get_latest_xray_event(self):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute("""
+        return self._fetchone("""
             SELECT satellite, current_class, current_ratio, current_int_xrlong, 
                    begin_time, begin_class, max_time, max_class, 
                    max_xrlong, end_time, end_class
             FROM xray
-            ORDER BY time_tag DESC
+            ORDER BY time_epoch DESC
             LIMIT 1
         """)
-        row = c.fetchone()
-        conn.close()
-        return row
 
     def insert_solarwind(self, time_tag, proton_speed, proton_density, proton_temperature):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO solarwind (time_tag, proton_speed, proton_density, proton_temperature)
-            VALUES (?, ?, ?, ?)
-        """, (time_tag, proton_speed, proton_density, proton_temperature))
-        conn.commit()
-        conn.close()
+        with self._transaction() as c:
+            c.execute("""
+                INSERT INTO solarwind (time_tag, proton_speed, proton_density, proton_temperature, time_epoch)
+                VALUES (?1, ?2, ?3, ?4, CAST(strftime('%s', ?1) AS INTEGER))
+            """, (time_tag, proton_speed, proton_density, proton_temperature))
+            # Bez źródła nie ma klucza znacznika ingestii - odświeżamy tylko agregaty.
+            self._refresh_rollups(c, "solarwind", [(time_tag,)])
+            self._bump_data_version(c, "solarwind")
+
+    def insert_solarwind_batch(self, rows):
+        rows = sorted(rows, key=lambda row: row[0])
+        if not rows:
+            return 0, 0
+
+        with self._transaction() as c:
+            changes_before = c.connection.total_changes
+            # Wiersze sprzed kolumny source mają source = NULL, a NULL-e nie kolidują w UNIQUE(time_tag, source).
+            c.executemany("""
+                INSERT INTO solarwind (time_tag, source, proton_speed, proton_density, proton_temperature, time_epoch)
+                SELECT ?1, ?2, ?3, ?4, ?5, CAST(strftime('%s', ?1) AS INTEGER)
+                WHERE NOT EXISTS (SELECT 1 FROM solarwind WHERE time_tag = ?1 AND source IS NULL)
+                ON CONFLICT(time_tag, source) DO NOTHING
+            """, rows)
+            inserted = c.connection.total_changes - changes_before
+
+            self._update_high_water_marks(c, "solarwind", self._newest_by_source(rows))
+            self._refresh_rollups(c, "solarwind", rows)
+            if inserted:
+                self._bump_data_version(c, "solarwind")
+        return inserted, len(rows) - inserted
 
     def check_solarwind_exists(self, time_tag):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM solarwind WHERE time_tag = ?", (time_tag,))
-        row = c.fetchone()
-        conn.close()
+        row = self._fetchone("SELECT 1 FROM solarwind WHERE time_tag = ?", (time_tag,))
         return (row is not None)
 
     def get_recent_solarwind(self, limit):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
         if limit is None:
-            c.execute("""
+            return self._fetchall("""
                 SELECT id, time_tag, proton_speed, proton_density, proton_temperature
                 FROM solarwind
-                ORDER BY id DESC
+                ORDER BY time_epoch DESC, source DESC
             """)
-        else:
-            c.execute("""
-                SELECT id, time_tag, proton_speed, proton_density, proton_temperature
-                FROM solarwind
-                ORDER BY id DESC
-                LIMIT ?
-            """, (limit,))
-        rows = c.fetchall()
-        conn.close()
-        return rows
+        return self._fetchall("""
+            SELECT id, time_tag, proton_speed, proton_density, proton_temperature
+            FROM solarwind
+            ORDER BY time_epoch DESC, source DESC
+            LIMIT ?
+        """, (limit,))
 
     def get_latest_solarwind(self):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute("""
+        return self._fetchone("""
             SELECT id, time_tag, proton_speed, proton_density, proton_temperature
             FROM solarwind
-            ORDER BY id DESC
+            ORDER BY time_epoch DESC, source DESC
             LIMIT 1
         """)
-        row = c.fetchone()
-        conn.close()
-        return row
+
+    def get_solarwind_time_bounds(self):
+        return self._fetchone("""
+            SELECT (SELECT MIN(time_epoch) FROM solarwind),
+                   (SELECT MAX(time_epoch) FROM solarwind)
+        """)
+
+    @staticmethod
+    def _time_range_params(start_time, end_time):
+        # Koniec zakresu obejmuje całą sekundę; daty bez strefy czasowej traktujemy jako UTC.
+        return DBManager._datetime_epoch(start_time), DBManager._datetime_epoch(end_time) + 1
+
+    @staticmethod
+    def _datetime_epoch(value):
+        if isinstance(value, str):
+            return time_tag_epoch(value)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
 
     def check_goes_data_exists(self, time_tag, satellite):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute("""
+        row = self._fetchone("""
             SELECT 1 FROM goes_data
             WHERE time_tag = ? AND satellite = ?
         """, (time_tag, satellite))
-        row = c.fetchone()
-        conn.close()
         return row is not None
 
     def insert_goes_data(self, time_tag, satellite, flux, observed_flux, electron_correction, electron_contamination,
                          energy):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        """Zapisuje pomiar jednego pasma (rekord NOAA) do kolumn tego pasma we wspólnym wierszu."""
+        band = GOES_BANDS.get(energy)
+        if band is None:
+            raise ValueError(f"Nieznane pasmo GOES: {energy}")
+        columns = [f"{measure}_{band}" for measure in GOES_BAND_MEASURES]
+        with self._transaction() as c:
+            c.execute(f"""
+                INSERT INTO goes_data (time_tag, satellite, {", ".join(columns)}, time_epoch)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, CAST(strftime('%s', ?1) AS INTEGER))
+                ON CONFLICT(time_tag, satellite) DO UPDATE SET
+                {", ".join(f"{column} = excluded.{column}" for column in columns)}
+            """, (time_tag, satellite, flux, observed_flux, electron_correction, electron_contamination))
+            self._update_high_water_marks(c, "goes_data", {f"{satellite}/{band}": time_tag})
+            self._refresh_rollups(c, "goes_data", [(time_tag,)])
+            self._bump_data_version(c, "goes_data")
+
+    def insert_goes_data_batch(self, rows):
+        """Zapisuje wiersze GOES; zwraca (nowe, uzupełnione, pominięte).
+
+        Wiersz (czas, satelita), który już istnieje, dostaje wartości pasm obecnych w nowym
+        wierszu - pasmo dostarczone w późniejszym odpytaniu uzupełnia zapisany wiersz.
+        """
+        if isinstance(rows, dict):
+            rows = zip(*(rows[column] for column in self.GOES_DATA_COLUMNS))
+        rows = list(rows)
+        if not rows:
+            return 0, 0, 0
+
+        band_columns = _goes_band_columns()
+        with self._transaction() as c:
+            changes_before = c.connection.total_changes
+            last_id = c.execute("SELECT COALESCE(MAX(id), 0) FROM goes_data").fetchone()[0]
+            c.executemany(f"""
+                INSERT INTO goes_data ({", ".join(self.GOES_DATA_COLUMNS)}, time_epoch)
+                VALUES ({", ".join(f"?{i}" for i in range(1, len(self.GOES_DATA_COLUMNS) + 1))},
+                        CAST(strftime('%s', ?1) AS INTEGER))
+                ON CONFLICT(time_tag, satellite) DO UPDATE SET
+                {", ".join(f"{column} = COALESCE(excluded.{column}, goes_data.{column})" for column in band_columns)}
+                WHERE {" OR ".join(
+                    f"(excluded.{column} IS NOT NULL AND excluded.{column} IS NOT goes_data.{column})"
+                    for column in band_columns
+                )}
+            """, rows)
+            written = c.connection.total_changes - changes_before
+            inserted = c.execute("SELECT COUNT(*) FROM goes_data WHERE id > ?", (last_id,)).fetchone()[0]
+
+            self._update_high_water_marks(c, "goes_data", self._newest_by_band(rows))
+            self._refresh_rollups(c, "goes_data", rows)
+            if written:
+                self._bump_data_version(c, "goes_data")
+        return inserted, written - inserted, len(rows) - written
+
+    @staticmethod
+    def _bump_data_version(c, table_name):
         c.execute("""
-            INSERT OR IGNORE INTO goes_data
-            (time_tag, satellite, flux, observed_flux, electron_correction, electron_contamination, energy)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (time_tag, satellite, flux, observed_flux, electron_correction, electron_contamination, energy))
-        conn.commit()
-        conn.close()
+            INSERT INTO data_version (table_name, version)
+            VALUES (?, 1)
+            ON CONFLICT(table_name) DO UPDATE SET version = version + 1
+        """, (table_name,))
+
+    def get_data_versions(self):
+        """Wersje danych tabel - zmieniają się przy każdym zapisie, więc służą za klucz pamięci podręcznej."""
+        versions = dict.fromkeys(self.VERSIONED_TABLES, 0)
+        versions.update(self._fetchall("SELECT table_name, version FROM data_version"))
+        return versions
+
+    def get_high_water_marks(self, feed):
+        rows = self._fetchall("SELECT source, time_tag FROM ingest_marks WHERE feed = ?", (feed,))
+        return dict(rows)
+
+    @staticmethod
+    def _refresh_rollups(c, table, rows):
+        if not rows:
+            return
+        epochs = [time_tag_epoch(row[0]) for row in rows]
+        first, last = min(epochs), max(epochs)
+        for resolution in ROLLUP_RESOLUTIONS:
+            start = first // resolution * resolution
+            end = last // resolution * resolution + resolution
+            c.execute(_rollup_refresh_sql(table, resolution, "WHERE time_epoch >= ? AND time_epoch < ?"), (start, end))
+
+    @staticmethod
+    def choose_rollup_resolution(start_time, end_time, max_points, raw_interval=60):
+        """Najdrobniejsza rozdzielczość, przy której zakres mieści się w max_points (None = dane surowe)."""
+        span = (end_time - start_time).total_seconds()
+        if span / raw_interval <= max_points:
+            return None
+        for resolution in ROLLUP_RESOLUTIONS:
+            if span / resolution <= max_points:
+                return resolution
+        return ROLLUP_RESOLUTIONS[-1]
+
+    def _fetch_columns(self, sql, params, dtype):
+        """Wynik zapytania jako słownik kolumna -> tablica NumPy o typie z dtype.
+
+        Wiersze są pobierane partiami (fetchmany) i od razu pakowane w tablicę strukturalną,
+        więc krotki Pythona istnieją tylko dla jednej partii naraz. NULL w kolumnach
+        zmiennoprzecinkowych staje się NaN.
+        """
+        chunks = []
+        with self.pool.connection() as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(self.COLUMNAR_CHUNK_ROWS)
+                if not rows:
+                    break
+                chunks.append(np.array(rows, dtype=dtype))
+        table = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+        return {name: np.ascontiguousarray(table[name]) for name in dtype.names}
+
+    def _solarwind_range_query(self, start_time, end_time, resolution=None, stat="mean"):
+        """SQL i parametry odczytu zakresu wiatru słonecznego (surowe dane lub agregaty o danej rozdzielczości)."""
+        if resolution is None:
+            return """
+                SELECT time_epoch, proton_speed, proton_density, proton_temperature
+                FROM solarwind
+                WHERE time_epoch >= ? AND time_epoch < ?
+                ORDER BY time_epoch
+            """, self._time_range_params(start_time, end_time)
+
+        self._check_stat(stat)
+        return f"""
+            SELECT bucket, proton_speed_{stat}, proton_density_{stat}, proton_temperature_{stat}
+            FROM solarwind_rollup
+            WHERE resolution = ? AND bucket >= ? AND bucket <= ?
+            ORDER BY bucket
+        """, self._rollup_range_params(resolution, start_time, end_time)
+
+    def _goes_flux_range_query(self, start_time, end_time, resolution=None, stat="max"):
+        """SQL i parametry odczytu strumienia GOES obu pasm (surowe dane lub agregaty)."""
+        if resolution is None:
+            return """
+                SELECT time_epoch, satellite, flux_long, flux_short
+                FROM goes_data
+                WHERE time_epoch >= ? AND time_epoch < ?
+                ORDER BY time_epoch
+            """, self._time_range_params(start_time, end_time)
+
+        self._check_stat(stat)
+        return f"""
+            SELECT bucket, satellite, flux_long_{stat}, flux_short_{stat}
+            FROM goes_rollup
+            WHERE resolution = ? AND bucket >= ? AND bucket <= ?
+            ORDER BY bucket, satellite
+        """, self._rollup_range_params(resolution, start_time, end_time)
+
+    @staticmethod
+    def _check_stat(stat):
+        if stat not in ("min", "max", "mean"):
+            raise ValueError(f"Nieznana statystyka: {stat}")
+
+    def get_solarwind_columns(self, start_time, end_time, resolution=None, stat="mean"):
+        """Wiatr słoneczny w zakresie jako kolumny NumPy (surowe dane lub agregaty o danej rozdzielczości)."""
+        return self._fetch_columns(*self._solarwind_range_query(start_time, end_time, resolution, stat),
+                                   self.SOLARWIND_COLUMNS_DTYPE)
+
+    def get_goes_flux_columns(self, start_time, end_time, resolution=None, stat="max"):
+        """Strumień GOES w zakresie jako kolumny NumPy (czas, satelita, flux pasma długiego i krótkiego)."""
+        return self._fetch_columns(*self._goes_flux_range_query(start_time, end_time, resolution, stat),
+                                   self.GOES_FLUX_COLUMNS_DTYPE)
+
+    def get_solarwind_rollup(self, resolution, start_time, end_time, stat="mean"):
+        return self._fetchall(*self._solarwind_range_query(start_time, end_time, resolution, stat))
+
+    def get_goes_rollup(self, resolution, start_time, end_time, stat="max"):
+        return self._fetchall(*self._goes_flux_range_query(start_time, end_time, resolution, stat))
+
+    @staticmethod
+    def _rollup_range_params(resolution, start_time, end_time):
+        start = DBManager._datetime_epoch(start_time) // resolution * resolution
+        return resolution, start, DBManager._datetime_epoch(end_time)
+
+    @staticmethod
+    def _newest_by_source(rows):
+        newest = {}
+        for time_tag, source, *_ in rows:
+            key = str(source)
+            if time_tag > newest.get(key, ""):
+                newest[key] = time_tag
+        return newest
+
+    @staticmethod
+    def _newest_by_band(rows):
+        # Znaczniki GOES są per satelita i pasmo ("16/short"), bo pasma mogą przychodzić osobno.
+        newest = {}
+        measures = len(GOES_BAND_MEASURES)
+        for time_tag, satellite, *values in rows:
+            for index, band in enumerate(GOES_BANDS.values()):
+                if all(value is None for value in values[index * measures:(index + 1) * measures]):
+                    continue
+                key = f"{satellite}/{band}"
+                if time_tag > newest.get(key, ""):
+                    newest[key] = time_tag
+        return newest
+
+    @staticmethod
+    def _update_high_water_marks(c, feed, marks):
+        c.executemany("""
+            INSERT INTO ingest_marks (feed, source, time_tag)
+            VALUES (?, ?, ?)
+            ON CONFLICT(feed, source) DO UPDATE SET time_tag = MAX(time_tag, excluded.time_tag)
+        """, [(feed, source, time_tag) for source, time_tag in marks.items()])
 
     def get_recent_goes_data(self, limit):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
         if limit is None:
-            c.execute("""
-            SELECT id, time_tag, satellite, flux, observed_flux, electron_correction, electron_contamination, energy
+            return self._fetchall(f"""
+                SELECT id, {", ".join(self.GOES_DATA_COLUMNS)}
+                FROM goes_data
+                ORDER BY id DESC
+            """)
+        return self._fetchall(f"""
+            SELECT id, {", ".join(self.GOES_DATA_COLUMNS)}
             FROM goes_data
             ORDER BY id DESC
+            LIMIT ?
+        """, (limit,))
+
+    def get_goes_time_bounds(self):
+        return self._fetchone("""
+            SELECT (SELECT MIN(time_epoch) FROM goes_data),
+                   (SELECT MAX(time_epoch) FROM goes_data)
         """)
+
+    def get_table_columns(self, table_name, include_blobs=False):
+        if table_name not in self.BROWSABLE_TABLES:
+            raise ValueError(f"Nieznana tabela: {table_name}")
+        rows = self._fetchall(f"PRAGMA table_info({table_name})")
+        return [name for _, name, col_type, *_ in rows if include_blobs or col_type.upper() != "BLOB"]
+
+    def count_rows(self, table_name):
+        if table_name not in self.BROWSABLE_TABLES:
+            raise ValueError(f"Nieznana tabela: {table_name}")
+        return self._fetchone(f"SELECT COUNT(*) FROM {table_name}")[0]
+
+    def browse_table(self, table_name, limit=100, before_id=None, after_id=None, include_blobs=False):
+        """Jedna strona tabeli od najnowszych wierszy (paginacja po id, bez OFFSET).
+
+        before_id - strona starszych wierszy niż podany id, after_id - strona nowszych.
+        Kolumny BLOB są pomijane, chyba że include_blobs=True. Zwraca (wiersze, kolumny).
+        """
+        columns = self.get_table_columns(table_name, include_blobs)
+        projection = ", ".join(columns)
+        if after_id is not None:
+            rows = self._fetchall(
+                f"SELECT {projection} FROM {table_name} WHERE id > ? ORDER BY id ASC LIMIT ?",
+                (after_id, limit)
+            )
+            rows.reverse()
+        elif before_id is not None:
+            rows = self._fetchall(
+                f"SELECT {projection} FROM {table_name} WHERE id < ? ORDER BY id DESC LIMIT ?",
+                (before_id, limit)
+            )
         else:
-            c.execute("""
-                SELECT id, time_tag, satellite, flux, observed_flux, electron_correction, electron_contamination, energy
-                FROM goes_data
-                ORDER BY id DESC
-                LIMIT ?
-            """, (limit,))
-
-        rows = c.fetchall()
-        conn.close()
-        return rows
-
-    def get_all_from_table(self, table_name):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute(f"SELECT * FROM {table_name}")
-        rows = c.fetchall()
-        columns = [description[0] for description in c.description]
-        conn.close()
+            rows = self._fetchall(f"SELECT {projection} FROM {table_name} ORDER BY id DESC LIMIT ?", (limit,))
         return rows, columns
 
     def check_image_exists(self, source, image_hash):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute("SELECT 1 FROM solar_images WHERE source = ? AND image_hash = ?", (source, image_hash))
-        exists = c.fetchone() is not None
-        conn.close()
-        return exists
+        row = self._fetchone("SELECT 1 FROM solar_images WHERE source = ? AND image_hash = ?", (source, image_hash))
+        return row is not None
 
     def insert_solar_image(self, source, image_data, image_hash, time_tag):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO solar_images (source, image, image_hash, time_tag)
-            VALUES (?, ?, ?, ?)
-        """, (source, image_data, image_hash, time_tag))
-        conn.commit()
-        conn.close()
-
-    def get_latest_solar_images(self):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        path = self.image_store.put(image_hash, image_data)
+        with self._transaction() as c:
+            c.execute("""
+                INSERT INTO solar_images (source, image, image_hash, time_tag, path, time_epoch)
+                VALUES (?1, X'', ?2, ?3, ?4, CAST(strftime('%s', ?3) AS INTEGER))
+            """, (source, image_hash, time_tag, path))
+            self._bump_data_version(c, "solar_images")
+        return path
 
-        c.execute("""
-            SELECT source, image, time_tag
-            FROM solar_images
-            WHERE (source, time_tag) IN (
-                SELECT source, MAX(time_tag)
-                FROM solar_images
-                GROUP BY source
+    def _resolve_images(self, rows, max_size=None):
+        # Wiersze (source, image, path, time_tag) -> (source, ścieżka pliku lub BLOB, time_tag).
+        return [
+            (
+                source,
+                self.image_store.absolute_path(self.image_store.best_path(path, max_size))
+                if path is not None else image,
+                time_tag
             )
-        """)
+            for source, image, path, time_tag in rows
+        ]
 
-        images = c.fetchall()
-        conn.close()
-        return images
+    def get_stored_image_paths(self):
+        rows = self._fetchall("SELECT DISTINCT path FROM solar_images WHERE path IS NOT NULL")
+        return [path for (path,) in rows]
 
-    def get_solar_images_for_sources_in_range(self, start_time, end_time, sources):
+    def get_latest_solar_images(self, max_size=None):
+        # Rekurencyjne CTE przechodzi po kolejnych źródłach w indeksie (source, time_tag),
+        # więc koszt zależy od liczby źródeł, a nie od liczby zapisanych obrazów.
+        return self._resolve_images(self._fetchall("""
+            WITH RECURSIVE sources(source) AS (
+                SELECT MIN(source) FROM solar_images
+                UNION ALL
+                SELECT (SELECT MIN(source) FROM solar_images WHERE source > sources.source)
+                FROM sources
+                WHERE sources.source IS NOT NULL
+            )
+            SELECT img.source, CASE WHEN img.path IS NULL THEN img.image END, img.path, img.time_tag
+            FROM sources
+            JOIN solar_images AS img ON img.id = (
+                SELECT id FROM solar_images
+                WHERE source = sources.source
+                ORDER BY time_epoch DESC
+                LIMIT 1
+            )
+            ORDER BY img.source
+        """), max_size)
+
+    def get_solar_images_for_sources_in_range(self, start_time, end_time, sources, max_size=None):
         placeholders = ", ".join(["?"] * len(sources))
         sql = f"""
-            SELECT source, image, time_tag
+            SELECT source, CASE WHEN path IS NULL THEN image END, path, time_tag
             FROM solar_images
-            WHERE time_tag >= ?
-              AND time_tag <= ?
+            WHERE time_epoch >= ?
+              AND time_epoch <= ?
               AND source IN ({placeholders})
-            ORDER BY time_tag ASC
+            ORDER BY time_epoch ASC
         """
-        params = [start_time, end_time] + list(sources)
-
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute(sql, params)
-        rows = c.fetchall()
-        conn.close()
-        return rows
+        params = [self._datetime_epoch(start_time), self._datetime_epoch(end_time)] + list(sources)
+        return self._resolve_images(self._fetchall(sql, params), max_size)
+
+    def get_solar_image_frames_in_range(self, start_time, end_time, source, max_size=None):
+        """Klatki animacji (ścieżki plików); BLOB-y starych wierszy są wczytywane dopiero przy dekodowaniu.
+
+        Próbkowanie do limitu klatek robi budowanie animacji (gif_utils.sample_evenly).
+        """
+        rows = self._fetchall("""
+            SELECT id, path
+            FROM solar_images
+            WHERE source = ?
+              AND time_epoch >= ?
+              AND time_epoch <= ?
+            ORDER BY time_epoch ASC
+        """, (source, self._datetime_epoch(start_time), self._datetime_epoch(end_time)))
+
+        return [
+            self.image_store.absolute_path(self.image_store.best_path(path, max_size))
+            if path is not None else partial(self._load_image_blob, image_id)
+            for image_id, path in rows
+        ]
+
+    def get_solar_image_timeline(self, source, start_time, max_size=None):
+        """(klatka, time_tag, image_hash) obrazów źródła od start_time, rosnąco po czasie."""
+        rows = self._fetchall("""
+            SELECT id, path, time_tag, image_hash
+            FROM solar_images
+            WHERE source = ?
+              AND time_epoch >= ?
+            ORDER BY time_epoch ASC
+        """, (source, self._datetime_epoch(start_time)))
+
+        return [
+            (self.image_store.absolute_path(self.image_store.best_path(path, max_size))
+             if path is not None else partial(self._load_image_blob, image_id), time_tag, image_hash)
+            for image_id, path, time_tag, image_hash in rows
+        ]
+
+    def get_image_range_signature(self, start_time, end_time, source):
+        """(najnowszy image_hash, liczba obrazów) w zakresie - klucz unieważniania animacji."""
+        return self._fetchone("""
+            SELECT (SELECT image_hash FROM solar_images
+                    WHERE source = ? AND time_epoch >= ? AND time_epoch <= ?
+                    ORDER BY time_epoch DESC
+                    LIMIT 1),
+                   (SELECT COUNT(*) FROM solar_images
+                    WHERE source = ? AND time_epoch >= ? AND time_epoch <= ?)
+        """, (source, self._datetime_epoch(start_time), self._datetime_epoch(end_time)) * 2)
+
+    def _load_image_blob(self, image_id):
+        row = self._fetchone("SELECT image FROM solar_images WHERE id = ?", (image_id,))
+        return row[0] if row else None
+
+    def move_images_to_store(self, batch_size=50, vacuum=True):
+        """Przenosi BLOB-y z solar_images do ImageStore; zwraca liczbę przeniesionych obrazów."""
+        moved = 0
+        while True:
+            rows = self._fetchall("""
+                SELECT id, image_hash, image FROM solar_images
+                WHERE path IS NULL
+                LIMIT ?
+            """, (batch_size,))
+            if not rows:
+                break
+
+            updates = [(self.image_store.put(image_hash, image), image_id) for image_id, image_hash, image in rows]
+            with self._transaction() as c:
+                c.executemany("UPDATE solar_images SET path = ?, image = X'' WHERE id = ?", updates)
+                self._bump_data_version(c, "solar_images")
+            moved += len(updates)
+
+        if moved and vacuum:
+            with self.pool.connection() as conn:
+                conn.execute("VACUUM")
+        return moved
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype("datetime64[ns]").astype(np.int64)
+    return values.astype(np.float64)
+
+
+def _bucket_edges(n, n_buckets, first=0):
+    return np.linspace(first, n, n_buckets + 1).astype(np.int64)
+
+
+def minmax_indices(y, n_out):
+    """Indeksy punktów min i max w każdym kubełku (łącznie co najwyżej n_out punktów)."""
+    y = _as_float(y)
+    n = len(y)
+    if n <= n_out or n_out < 2:
+        return np.arange(n)
+
+    # Dwa miejsca zostają na punkty końcowe, reszta to pary min/max kubełków.
+    n_buckets = max(1, (n_out - 2) // 2)
+    edges = _bucket_edges(n, n_buckets)
+    starts = edges[:-1]
+
+    # Każdy kubełek ma co najwyżej ceil(n / n_buckets) punktów - dopełniamy do prostokąta i liczymy naraz.
+    width = int(np.max(np.diff(edges)))
+    offsets = starts[:, None] + np.arange(width)[None, :]
+    valid = offsets < edges[1:, None]
+    padded = y[np.minimum(offsets, n - 1)]
+
+    argmin = np.argmin(np.where(valid, padded, np.inf), axis=1)
+    argmax = np.argmax(np.where(valid, padded, -np.inf), axis=1)
+
+    indices = np.concatenate([starts + argmin, starts + argmax, [0, n - 1]])
+    return np.unique(indices)
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indeksy n_out punktów zachowujących kształt serii."""
+    x = _as_float(x)
+    y = _as_float(y)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    edges = _bucket_edges(n - 1, n_out - 2, first=1)
+
+    # Średnie kubełków liczone wektorowo z sum skumulowanych; ostatni "kubełek" to punkt końcowy.
+    cum_x = np.concatenate([[0.0], np.cumsum(x)])
+    cum_y = np.concatenate([[0.0], np.cumsum(y)])
+    counts = np.diff(edges)
+    avg_x = np.append((cum_x[edges[1:]] - cum_x[edges[:-1]]) / counts, x[-1])
+    avg_y = np.append((cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        area = np.abs(
+            (x[previous] - avg_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_indices(x, y, max_points, mode="lttb"):
+    """Indeksy (rosnące) co najwyżej max_points skończonych punktów serii; x musi być posortowane."""
+    finite = np.flatnonzero(np.isfinite(_as_float(y)))
+    if len(finite) <= max_points:
+        return finite
+
+    if mode == "minmax":
+        selected = minmax_indices(np.asarray(y)[finite], max_points)
+    elif mode == "lttb":
+        selected = lttb_indices(np.asarray(x)[finite], np.asarray(y)[finite], max_points)
+    else:
+        raise ValueError(f"Nieznany tryb próbkowania: {mode}")
+    return finite[selected]
+
+
+def downsample_frame(df, x, y, max_points, mode="lttb", group=None):
+    """Zwraca podzbiór wierszy df, tak by każda seria miała co najwyżej max_points punktów."""
+    if group is not None:
+        parts = [
+            downsample_frame(part, x, y, max_points, mode)
+            for _, part in df.groupby(group, sort=False)
+        ]
+        return pd.concat(parts) if parts else df
+
+    if len(df) <= max_points:
+        return df
+
+    df = df.sort_values(x)
+    x_values = df[x]
+    if isinstance(x_values.dtype, pd.DatetimeTZDtype):
+        x_values = x_values.dt.tz_convert(None)
+    return df.iloc[downsample_indices(x_values.to_numpy(), df[y].to_numpy(), max_points, mode)]
@@ -1,30 +1,227 @@
-from PIL import Image
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, GifImagePlugin
 from io import BytesIO
 
+# Domyślne limity animacji: liczba klatek (próbkowanych równomiernie) i bok klatki w px.
+MAX_GIF_FRAMES = 240
+MAX_GIF_SIZE = 512
+
+# Z ilu klatek (i w jakiej skali) budowana jest wspólna paleta 256 kolorów.
+PALETTE_SAMPLE_FRAMES = 4
+PALETTE_SAMPLE_SIZE = 128
+
+# Formaty animacji: klucz -> (format Pillow, rozszerzenie pliku, typ MIME). "apng" to animowany PNG.
+ANIMATION_FORMATS = {
+    "gif": ("GIF", "gif", "image/gif"),
+    "webp": ("WEBP", "webp", "image/webp"),
+    "apng": ("PNG", "png", "image/apng")
+}
+WEBP_QUALITY = 80
+
+# Liczba procesów przygotowujących klatki (1 = tryb szeregowy) i minimalna liczba klatek dla puli.
+FRAME_WORKERS = int(os.getenv("SPACE_WEATHER_GIF_WORKERS", str(os.cpu_count() or 1)))
+MIN_FRAMES_FOR_POOL = 16
+
+_frame_pool = None
+_frame_pool_workers = 0
+_frame_pool_lock = threading.Lock()
+
+
+def sample_evenly(items, max_frames):
+    items = list(items)
+    if max_frames is None or len(items) <= max_frames:
+        return items
+    if max_frames < 2:
+        return items[:max_frames]
+    last = len(items) - 1
+    return [items[round(i * last / (max_frames - 1))] for i in range(max_frames)]
+
+
+def open_frame(frame, max_size=None):
+    """Dekoduje jedną klatkę (ścieżka, BLOB lub funkcja zwracająca BLOB) do RGB o boku <= max_size."""
+    if callable(frame):
+        frame = frame()
+    img = Image.open(frame if isinstance(frame, str) else BytesIO(frame))
+    if max_size is not None:
+        # JPEG dekodowany od razu w zmniejszonej skali - pełna rozdzielczość nie trafia do pamięci.
+        img.draft("RGB", (max_size, max_size))
+    img = img.convert("RGB")
+    if max_size is not None:
+        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    return img
 
-def create_gif_in_memory(images_data_list, duration_ms=500):
-    if len(images_data_list) < 2:
-        return None
 
-    frames = []
-    for bin_data in images_data_list:
+def build_palette(frames):
+    """Wspólna paleta z kilku klatek rozłożonych na całym zakresie."""
+    samples = []
+    for frame in sample_evenly(frames, PALETTE_SAMPLE_FRAMES):
         try:
-            img = Image.open(BytesIO(bin_data))
-            frames.append(img.convert("RGBA"))
+            samples.append(open_frame(frame, PALETTE_SAMPLE_SIZE))
         except Exception as e:
             print("Błąd odczytu klatki PIL:", e)
+    if not samples:
+        return None
+
+    mosaic = Image.new("RGB", (PALETTE_SAMPLE_SIZE * len(samples), PALETTE_SAMPLE_SIZE))
+    for i, sample in enumerate(samples):
+        mosaic.paste(sample, (i * PALETTE_SAMPLE_SIZE, 0))
+    return mosaic.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+
+
+def prepare_frame(frame, max_size, palette_colors):
+    """Dekodowanie, skalowanie i kwantyzacja jednej klatki; zwraca (rozmiar, piksele P) lub None.
+
+    Bez palety (WebP, APNG) klatka nie jest kwantyzowana i zwracane są piksele RGB.
+    """
+    try:
+        img = open_frame(frame, max_size)
+    except Exception as e:
+        print("Błąd odczytu klatki PIL:", e)
+        return None
+
+    if palette_colors is None:
+        return img.size, img.tobytes()
+
+    palette = Image.new("P", (1, 1))
+    palette.putpalette(palette_colors)
+    quantized = img.quantize(palette=palette, dither=Image.Dither.NONE)
+    return quantized.size, quantized.tobytes()
+
+
+def _get_frame_pool(workers):
+    global _frame_pool, _frame_pool_workers
+    with _frame_pool_lock:
+        if _frame_pool is None or _frame_pool_workers != workers:
+            if _frame_pool is not None:
+                _frame_pool.shutdown(wait=False, cancel_futures=True)
+            # "spawn", bo Streamlit działa wielowątkowo, a fork procesu z wątkami nie jest bezpieczny.
+            _frame_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _frame_pool_workers = workers
+        return _frame_pool
 
+
+def _discard_frame_pool():
+    global _frame_pool
+    with _frame_pool_lock:
+        if _frame_pool is not None:
+            _frame_pool.shutdown(wait=False, cancel_futures=True)
+        _frame_pool = None
+
+
+def iter_prepared_frames(frames, max_size, palette_colors, workers=None):
+    """Przygotowane klatki w oryginalnej kolejności; równolegle w puli procesów, gdy to się opłaca."""
+    workers = FRAME_WORKERS if workers is None else workers
+    if workers <= 1 or len(frames) < MIN_FRAMES_FOR_POOL:
+        for frame in frames:
+            yield prepare_frame(frame, max_size, palette_colors)
+        return
+
+    done = 0
+    try:
+        pool = _get_frame_pool(workers)
+        pending = deque()
+        # Okno 2 x liczba procesów ogranicza liczbę klatek czekających w pamięci.
+        for frame in frames:
+            if callable(frame):
+                frame = frame()
+            pending.append(pool.submit(prepare_frame, frame, max_size, palette_colors))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+                done += 1
+        while pending:
+            yield pending.popleft().result()
+            done += 1
+    except (BrokenProcessPool, OSError) as e:
+        print("Pula procesów niedostępna, przygotowanie klatek szeregowo:", e)
+        _discard_frame_pool()
+        for frame in frames[done:]:
+            yield prepare_frame(frame, max_size, palette_colors)
+
+
+def write_gif(frames, fp, duration_ms=500, max_size=MAX_GIF_SIZE, workers=None):
+    """Zapisuje animację klatka po klatce; w pamięci jest naraz tylko kilka przygotowanych klatek."""
+    frames = list(frames)
+    palette = build_palette(frames)
+    if palette is None:
+        return 0
+    palette_colors = palette.getpalette()
+
+    frame_size = None
+    written = 0
+    for prepared in iter_prepared_frames(frames, max_size, palette_colors, workers):
+        if prepared is None:
+            continue
+
+        size, pixels = prepared
+        quantized = Image.frombytes("P", size, pixels)
+        quantized.putpalette(palette_colors)
+        if frame_size is None:
+            frame_size = size
+        elif size != frame_size:
+            quantized = quantized.resize(frame_size, Image.Resampling.NEAREST)
+
+        if written == 0:
+            header, _ = GifImagePlugin.getheader(quantized, info={"loop": 0})
+            fp.write(b"".join(header))
+        for chunk in GifImagePlugin.getdata(quantized, duration=duration_ms):
+            fp.write(chunk)
+        written += 1
+
+    if written:
+        fp.write(b";")
+    return written
+
+
+def write_animation(frames, fp, fmt="gif", duration_ms=500, max_size=MAX_GIF_SIZE, workers=None,
+                    quality=WEBP_QUALITY, lossless=False):
+    """Zapisuje animację GIF, WebP lub APNG; zwraca liczbę zapisanych klatek."""
+    if fmt == "gif":
+        return write_gif(frames, fp, duration_ms, max_size, workers)
+
+    pil_format = ANIMATION_FORMATS[fmt][0]
+    # Pillow koduje WebP/APNG z listy klatek - w pamięci są wszystkie klatki RGB (po zmniejszeniu).
+    images = []
+    for prepared in iter_prepared_frames(list(frames), max_size, None, workers):
+        if prepared is None:
+            continue
+        size, pixels = prepared
+        img = Image.frombytes("RGB", size, pixels)
+        if images and size != images[0].size:
+            img = img.resize(images[0].size, Image.Resampling.LANCZOS)
+        images.append(img)
+    if not images:
+        return 0
+
+    params = {"save_all": True, "append_images": images[1:], "duration": duration_ms, "loop": 0}
+    if pil_format == "WEBP":
+        params.update(quality=quality, lossless=lossless, method=4)
+    else:
+        # APNG jest zawsze bezstratny; "optimize" wydłuża kodowanie bez dużego zysku.
+        params.update(compress_level=6)
+    images[0].save(fp, format=pil_format, **params)
+    return len(images)
+
+
+def create_animation_in_memory(images_data_list, fmt="gif", duration_ms=500, max_frames=MAX_GIF_FRAMES,
+                               max_size=MAX_GIF_SIZE, workers=None, quality=WEBP_QUALITY, lossless=False):
+    frames = sample_evenly(images_data_list, max_frames)
     if len(frames) < 2:
         return None
 
-    gif_buffer = BytesIO()
-    frames[0].save(
-        gif_buffer,
-        format="GIF",
-        save_all=True,
-        append_images=frames[1:],
-        duration=duration_ms,
-        loop=0
-    )
-    gif_buffer.seek(0)
-    return gif_buffer
+    buffer = BytesIO()
+    if write_animation(frames, buffer, fmt, duration_ms, max_size, workers, quality, lossless) < 2:
+        return None
+
+    buffer.seek(0)
+    return buffer
+
+
+def create_gif_in_memory(images_data_list, duration_ms=500, max_frames=MAX_GIF_FRAMES, max_size=MAX_GIF_SIZE,
+                         workers=None):
+    return create_animation_in_memory(images_data_list, "gif", duration_ms, max_frames, max_size, workers)
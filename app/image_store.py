@@ -0,0 +1,88 @@
+import os
+import sys
+from io import BytesIO
+
+from PIL import Image
+
+from app.utils import write_atomic
+
+
+class ImageStore:
+    """Magazyn obrazów na dysku adresowany skrótem SHA-256 (image_hash)."""
+
+    # Boki (px) pomniejszonych wariantów generowanych przy zapisie obrazu.
+    VARIANT_SIZES = (256, 512)
+
+    def __init__(self, root):
+        self.root = root
+
+    def relative_path(self, image_hash, suffix=".jpg"):
+        return os.path.join(image_hash[:2], image_hash[2:4], f"{image_hash}{suffix}")
+
+    def absolute_path(self, relative_path):
+        return os.path.join(self.root, relative_path)
+
+    def put(self, image_hash, image_data, suffix=".jpg"):
+        relative_path = self.relative_path(image_hash, suffix)
+        if not os.path.exists(self.absolute_path(relative_path)):
+            write_atomic(self.absolute_path(relative_path), image_data)
+        return relative_path
+
+    @staticmethod
+    def variant_path(relative_path, size):
+        base, ext = os.path.splitext(relative_path)
+        return f"{base}_{size}{ext}"
+
+    def put_variants(self, relative_path, image_data=None, sizes=None):
+        """Tworzy pomniejszone warianty obrazu (raz, przy zapisie); zwraca ich ścieżki."""
+        sizes = sorted(sizes or self.VARIANT_SIZES, reverse=True)
+        missing = [size for size in sizes if not os.path.exists(self.absolute_path(self.variant_path(relative_path, size)))]
+        if not missing:
+            return [self.variant_path(relative_path, size) for size in sizes]
+
+        source = BytesIO(image_data) if image_data is not None else self.absolute_path(relative_path)
+        with Image.open(source) as img:
+            # Tryb draft dekoduje JPEG od razu w zmniejszonej skali (1/2, 1/4, 1/8).
+            img.draft("RGB", (missing[0], missing[0]))
+            img = img.convert("RGB")
+            for size in sizes:
+                variant = self.variant_path(relative_path, size)
+                img.thumbnail((size, size), Image.Resampling.LANCZOS)
+                if size in missing:
+                    buffer = BytesIO()
+                    img.save(buffer, format="JPEG", quality=85, optimize=True)
+                    write_atomic(self.absolute_path(variant), buffer.getvalue())
+        return [self.variant_path(relative_path, size) for size in sizes]
+
+    def best_path(self, relative_path, max_size=None):
+        """Najmniejszy istniejący wariant o boku >= max_size (lub oryginał)."""
+        if max_size is not None:
+            for size in sorted(self.VARIANT_SIZES):
+                variant = self.variant_path(relative_path, size)
+                if size >= max_size and os.path.exists(self.absolute_path(variant)):
+                    return variant
+        return relative_path
+
+
+def main(argv=None):
+    from app.db_manager import DBManager
+
+    args = list(sys.argv[1:] if argv is None else argv)
+    if not args or args[0] not in ("migrate", "variants"):
+        print("Użycie: python -m app.image_store {migrate|variants} [ścieżka_bazy]")
+        return 2
+
+    db = DBManager(args[1]) if len(args) > 1 else DBManager()
+    if args[0] == "migrate":
+        moved = db.move_images_to_store()
+        print(f"Przeniesiono {moved} obrazów do {db.image_store.root}")
+    else:
+        paths = db.get_stored_image_paths()
+        for relative_path in paths:
+            db.image_store.put_variants(relative_path)
+        print(f"Wygenerowano warianty dla {len(paths)} obrazów")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.db_manager import DBManager, GOES_BANDS
+from app.data_fetcher import (NOAADataFetcher, XRayDataFetcher, GOESSecondaryFetcher,
+                              GOESPrimaryFetcher, SolarImageFetcher, fetch_concurrently)
+from app.rolling_animation import RollingAnimation
+
+
+class SpaceWeatherIngestor:
+    def __init__(self, db=None):
+        self.db = db if db is not None else DBManager()
+
+        self.wind_fetcher = NOAADataFetcher()
+
+        self.xray_fetcher = XRayDataFetcher()
+
+        self.goes_primary_fetcher = GOESPrimaryFetcher()
+
+        self.goes_secondary_fetcher = GOESSecondaryFetcher()
+
+        self.image_fetcher = SolarImageFetcher()
+
+        self.rolling_animation = RollingAnimation.for_database(self.db)
+
+    def fetch_and_save_solarwind(self):
+        data = self.wind_fetcher.fetch_data()
+        if not data:
+            return None
+
+        marks = self.db.get_high_water_marks("solarwind")
+        rows = []
+        for record in data:
+            time_tag = record.get("time_tag", None)
+            source = record.get("source", None)
+            if not time_tag or not record.get("active", True):
+                continue
+
+            if time_tag <= marks.get(str(source), ""):
+                continue
+
+            rows.append((
+                time_tag,
+                source,
+                record.get("proton_speed", 0.0),
+                record.get("proton_density", 0.0),
+                record.get("proton_temperature", 0.0)
+            ))
+
+        self.db.insert_solarwind_batch(rows)
+        self.wind_fetcher.commit()
+        return data[0].get("time_tag", None)
+
+    def fetch_and_save_xray(self):
+        data = self.xray_fetcher.fetch_data()
+        if not data:
+            return None
+
+        latest = data[-1]
+        time_tag = latest.get("time_tag", None)
+        if not time_tag:
+            return None
+
+        if not self.db.check_xray_exists(time_tag):
+            satellite = latest.get("satellite", None)
+            current_class = latest.get("current_class", None)
+            current_ratio = latest.get("current_ratio", None)
+            current_int_xrlong = latest.get("current_int_xrlong", None)
+            begin_time = latest.get("begin_time", None)
+            begin_class = latest.get("begin_class", None)
+            max_time = latest.get("max_time", None)
+            max_class = latest.get("max_class", None)
+            max_xrlong = latest.get("max_xrlong", None)
+            end_time = latest.get("end_time", None)
+            end_class = latest.get("end_class", None)
+
+            self.db.insert_xray(
+                time_tag,
+                satellite,
+                current_class,
+                current_ratio,
+                current_int_xrlong,
+                begin_time,
+                begin_class,
+                max_time,
+                max_class,
+                max_xrlong,
+                end_time,
+                end_class
+            )
+        self.xray_fetcher.commit()
+        return time_tag
+
+    def fetch_and_save_goes(self):
+        results = fetch_concurrently({
+            "primary": self.goes_primary_fetcher.fetch_data,
+            "secondary": self.goes_secondary_fetcher.fetch_data
+        })
+        data = []
+        for name, result in results.items():
+            if result.error is not None:
+                print(f"Błąd pobierania danych GOES ({name}): {result.error}")
+            elif result.value:
+                data.extend(result.value)
+        saved = self._save_goes_data(data)
+        self.goes_primary_fetcher.commit()
+        self.goes_secondary_fetcher.commit()
+        return saved
+
+    def _save_goes_data(self, data):
+        # NOAA podaje osobny rekord dla każdego pasma; łączymy je w jeden wiersz (czas, satelita).
+        marks = self.db.get_high_water_marks("goes_data")
+        rows = {}
+        for record in data:
+            time_tag = record.get("time_tag")
+            satellite = record.get("satellite")
+            band = GOES_BANDS.get(record.get("energy"))
+
+            if not time_tag or satellite is None or band is None:
+                continue
+
+            if time_tag <= marks.get(f"{satellite}/{band}", ""):
+                continue
+
+            row = rows.setdefault((time_tag, satellite), {"time_tag": time_tag, "satellite": satellite})
+            row[f"flux_{band}"] = record.get("flux")
+            row[f"observed_flux_{band}"] = record.get("observed_flux")
+            row[f"electron_correction_{band}"] = record.get("electron_correction")
+            row[f"electron_contamination_{band}"] = record.get("electron_contaminaton")
+
+        return self.db.insert_goes_data_batch(
+            tuple(row.get(column) for column in DBManager.GOES_DATA_COLUMNS) for row in rows.values()
+        )
+
+    def fetch_and_save_solar_images(self):
+        images = self.image_fetcher.fetch_images()
+        new_images = {}
+        for img in images:
+            if not self.db.check_image_exists(img["source"], img["image_hash"]):
+                try:
+                    # Warianty (i zarazem kontrola, że to obraz) przed wpisem do bazy: wpis podbija
+                    # wersję danych, więc pulpit może od razu sięgnąć po wariant 512 px.
+                    path = self.db.image_store.relative_path(img["image_hash"])
+                    self.db.image_store.put_variants(path, img["image_data"])
+                    self.db.insert_solar_image(
+                        img["source"],
+                        img["image_data"],
+                        img["image_hash"],
+                        img["time_tag"]
+                    )
+                except Exception as e:
+                    print(f"Błąd zapisu obrazu z {img['source']}: {e}")
+                    continue
+                new_images[img["source"]] = img
+                print(f"Zapisano nowy obraz: {img['source']}")
+            else:
+                print(f"Obraz z {img['source']} już istnieje. Pomijam zapis.")
+            self.image_fetcher.commit(img["source"])
+
+        for source in self.image_fetcher.image_sources:
+            self.update_rolling_animation(source, new_images.get(source))
+
+    def update_rolling_animation(self, source, img=None):
+        """Dopisuje nowy obraz do animacji ostatniej doby i usuwa stare klatki; pustą animację odtwarza z bazy."""
+        rolling = self.rolling_animation
+        if not rolling.has_frames(source):
+            since = datetime.now() - timedelta(seconds=rolling.window_seconds)
+            frames = self.db.get_solar_image_timeline(
+                source, since.strftime("%Y-%m-%d %H:%M:%S"), max_size=rolling.frame_size
+            )
+            if frames:
+                rolling.add_frames(source, frames)
+        elif img is not None:
+            rolling.add_frame(source, img["image_data"], img["time_tag"], img["image_hash"])
+        else:
+            rolling.expire(source)
+
+
+class IngestionScheduler:
+    DEFAULT_INTERVALS = {
+        "solarwind": 60,
+        "xray": 60,
+        "goes": 60,
+        "solar_images": 300
+    }
+
+    def __init__(self, ingestor=None, intervals=None, deadline=45):
+        self.ingestor = ingestor if ingestor is not None else SpaceWeatherIngestor()
+        self.intervals = dict(intervals or self.DEFAULT_INTERVALS)
+        self.deadline = deadline
+        self._next_run = {feed: 0.0 for feed in self.intervals}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_pending(self, now=None):
+        now = time.monotonic() if now is None else now
+        due = {}
+        for feed, interval in self.intervals.items():
+            if now < self._next_run[feed]:
+                continue
+            self._next_run[feed] = now + interval
+            due[feed] = getattr(self.ingestor, f"fetch_and_save_{feed}")
+
+        for feed, result in fetch_concurrently(due, deadline=self.deadline).items():
+            if result.error is not None:
+                print(f"Błąd pobierania danych ({feed}): {result.error}")
+        return min(self._next_run.values())
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            next_due = self.run_pending()
+            self._stop.wait(max(0.0, next_due - time.monotonic()))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="space-weather-ingest", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_background_scheduler = None
+_background_lock = threading.Lock()
+
+
+def start_background_ingestion():
+    """Uruchamia (raz na proces) wątek pobierający dane w tle."""
+    global _background_scheduler
+    with _background_lock:
+        if _background_scheduler is None:
+            _background_scheduler = IngestionScheduler().start()
+        return _background_scheduler
+
+
+def external_ingestion_enabled():
+    return os.getenv("SPACE_WEATHER_INGEST", "background").lower() == "external"
+
+
+def main():
+    scheduler = IngestionScheduler()
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
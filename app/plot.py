@@ -1,9 +1,26 @@
+import os
+
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
+from plotly.subplots import make_subplots
+
+from app.downsample import downsample_frame, downsample_indices
 
 
 class DataPlot:
+    # Powyżej tylu punktów na serię wykres jest próbkowany (tryby: "lttb" lub "minmax").
+    MAX_PLOT_POINTS = int(os.getenv("SPACE_WEATHER_MAX_PLOT_POINTS", "4000"))
+    DOWNSAMPLE_MODE = os.getenv("SPACE_WEATHER_DOWNSAMPLE_MODE", "lttb")
+
+    # Panele wykresu wiatru słonecznego: (kolumna, tytuł panelu, opis osi).
+    SOLARWIND_PANELS = (
+        ("proton_speed", "Prędkość protonów w czasie", "Prędkość (km/s)"),
+        ("proton_density", "Gęstość protonów w czasie", "Gęstość (protons/cm3)"),
+        ("proton_temperature", "Temperatura protonów w czasie", "Temperatura (K)"),
+    )
 
     @staticmethod
     def create_xray_event_table(event_data):
@@ -48,6 +65,19 @@ class DataPlot:
         df = pd.DataFrame(data)
         st.table(df)
 
+    @staticmethod
+    def format_numbers(df, columns, fmt="%.2e"):
+        """Formatuje kolumny liczbowe naraz dla całej kolumny (np.char.mod); puste wartości zostają puste."""
+        for col in columns:
+            if col not in df.columns:
+                continue
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            missing = np.isnan(values)
+            formatted = np.char.mod(fmt, np.where(missing, 0.0, values)).astype(object)
+            formatted[missing] = None
+            df[col] = formatted
+        return df
+
     @staticmethod
     def create_solarwind_table(data):
         df = pd.DataFrame(data, columns=[
@@ -80,249 +110,126 @@ class DataPlot:
         return df
 
     @staticmethod
-    def create_solarwind_speed_line_plot(df):
-        df_plot = df.copy()
+    def time_column(df):
+        """Czas jako datetime64: z liczbowego time_epoch (bez parsowania tekstu) albo z time_tag."""
+        if "time_epoch" in df.columns:
+            return pd.to_datetime(df["time_epoch"], unit="s")
+        return pd.to_datetime(df["time_tag"], errors="coerce")
 
-        df_plot["time_tag"] = pd.to_datetime(df_plot["time_tag"], errors="coerce")
-
-        if df_plot.empty or df_plot["time_tag"].isna().all():
-            st.warning("Brak poprawnych danych w 'time_tag' do wyświetlenia wykresu.")
-            return None
-
-        min_dt = df_plot["time_tag"].min()
-        max_dt = df_plot["time_tag"].max()
-
-        if pd.isna(min_dt) or pd.isna(max_dt):
-            st.warning("Brak poprawnego zakresu czasu.")
+    @staticmethod
+    def parse_time_bounds(bounds):
+        if not bounds or bounds[0] is None or bounds[1] is None:
             return None
 
-        if isinstance(min_dt, pd.Timestamp):
-            min_dt = min_dt.to_pydatetime()
-        if isinstance(max_dt, pd.Timestamp):
-            max_dt = max_dt.to_pydatetime()
-
-        start_dt = st.slider(
-            "Wybierz datę/godzinę początkową:",
-            min_value=min_dt,
-            max_value=max_dt,
-            value=min_dt,
-            format="DD-MM-YYYY HH:mm",
-            key="start_speed_dt_slider"
+        # Granice z bazy to sekundy od epoki (UTC); tekstowe time_tag są nadal akceptowane.
+        min_dt, max_dt = (
+            pd.to_datetime(value, unit="s", utc=True) if isinstance(value, (int, float))
+            else pd.to_datetime(value, errors="coerce", utc=True)
+            for value in bounds
         )
-
-        end_dt = st.slider(
-            "Wybierz datę/godzinę końcową:",
-            min_value=min_dt,
-            max_value=max_dt,
-            value=max_dt,
-            format="DD-MM-YYYY HH:mm",
-            key="end_speed_dt_slider"
-        )
-
-        if end_dt < start_dt:
-            st.warning("Data końcowa jest wcześniejsza niż data początkowa!")
-            return None
-
-        mask = (df_plot["time_tag"] >= start_dt) & (df_plot["time_tag"] <= end_dt)
-        df_filtered = df_plot[mask]
-
-        if df_filtered.empty:
-            st.warning("Nie ma danych w wybranym przedziale czasowym.")
+        if pd.isna(min_dt) or pd.isna(max_dt):
             return None
 
-        fig = px.line(
-            df_filtered,
-            x="time_tag",
-            y="proton_speed",
-            title="Prędkość protonów w czasie",
-            labels={"time_tag": "Czas", "proton_speed": "Prędkość (km/s)"}
-        )
-        fig.update_layout(width=800, height=500)
-
-        return fig
+        return min_dt.tz_convert(None).to_pydatetime(), max_dt.tz_convert(None).to_pydatetime()
 
     @staticmethod
-    def create_solarwind_density_line_plot(df):
-        df_plot = df.copy()
-
-        df_plot["time_tag"] = pd.to_datetime(df_plot["time_tag"], errors="coerce")
-
-        if df_plot.empty or df_plot["time_tag"].isna().all():
-            st.warning("Brak poprawnych danych w 'time_tag' do wyświetlenia wykresu.")
-            return None
-
-        min_dt = df_plot["time_tag"].min()
-        max_dt = df_plot["time_tag"].max()
-
-        if pd.isna(min_dt) or pd.isna(max_dt):
+    def select_time_range(bounds, key):
+        time_bounds = DataPlot.parse_time_bounds(bounds)
+        if time_bounds is None:
             st.warning("Brak poprawnego zakresu czasu.")
             return None
 
-        if isinstance(min_dt, pd.Timestamp):
-            min_dt = min_dt.to_pydatetime()
-        if isinstance(max_dt, pd.Timestamp):
-            max_dt = max_dt.to_pydatetime()
+        min_dt, max_dt = time_bounds
 
-        start_dt = st.slider(
-            "Wybierz datę/godzinę początkową:",
+        # Jeden suwak zakresu - koniec nie może wypaść przed początkiem.
+        start_dt, end_dt = st.slider(
+            "Wybierz zakres dat/godzin:",
             min_value=min_dt,
             max_value=max_dt,
-            value=min_dt,
+            value=(min_dt, max_dt),
             format="DD-MM-YYYY HH:mm",
-            key="start_density_dt_slider"
+            key=f"{key}_dt_range_slider"
         )
-
-        end_dt = st.slider(
-            "Wybierz datę/godzinę końcową:",
-            min_value=min_dt,
-            max_value=max_dt,
-            value=max_dt,
-            format="DD-MM-YYYY HH:mm",
-            key="end_density_dt_slider"
-        )
-
-        if end_dt < start_dt:
-            st.warning("Data końcowa jest wcześniejsza niż data początkowa!")
-            return None
-
-        mask = (df_plot["time_tag"] >= start_dt) & (df_plot["time_tag"] <= end_dt)
-        df_filtered = df_plot[mask]
-
-        if df_filtered.empty:
-            st.warning("Nie ma danych w wybranym przedziale czasowym.")
-            return None
-
-        fig = px.line(
-            df_filtered,
-            x="time_tag",
-            y="proton_density",
-            title="Gęstość protonów w czasie",
-            labels={"time_tag": "Czas", "proton_density": "Gęstość (protons/cm3)"}
-        )
-        fig.update_layout(width=800, height=500)
-
-        return fig
+        return start_dt, end_dt
 
     @staticmethod
-    def create_solarwind_temp_line_plot(df):
-        df_plot = df.copy()
-
-        df_plot["time_tag"] = pd.to_datetime(df_plot["time_tag"], errors="coerce")
-
-        if df_plot.empty or df_plot["time_tag"].isna().all():
-            st.warning("Brak poprawnych danych w 'time_tag' do wyświetlenia wykresu.")
-            return None
-
-        min_dt = df_plot["time_tag"].min()
-        max_dt = df_plot["time_tag"].max()
-
-        if pd.isna(min_dt) or pd.isna(max_dt):
-            st.warning("Brak poprawnego zakresu czasu.")
+    def create_solarwind_panel_plot(df):
+        """Prędkość, gęstość i temperatura jako trzy panele Scattergl ze wspólną osią czasu."""
+        if df.empty:
+            st.warning("Nie ma danych w wybranym przedziale czasowym.")
             return None
 
-        if isinstance(min_dt, pd.Timestamp):
-            min_dt = min_dt.to_pydatetime()
-        if isinstance(max_dt, pd.Timestamp):
-            max_dt = max_dt.to_pydatetime()
+        # Czas wyliczany raz dla wszystkich paneli; serie to tablice NumPy, bez kopii ramki.
+        times = DataPlot.time_column(df).to_numpy()
+        order = None
+        if len(times) > 1 and (np.diff(times) < np.timedelta64(0)).any():
+            order = np.argsort(times, kind="stable")
+            times = times[order]
 
-        start_dt = st.slider(
-            "Wybierz datę/godzinę początkową:",
-            min_value=min_dt,
-            max_value=max_dt,
-            value=min_dt,
-            format="DD-MM-YYYY HH:mm",
-            key="start_temp_dt_slider"
-        )
-
-        end_dt = st.slider(
-            "Wybierz datę/godzinę końcową:",
-            min_value=min_dt,
-            max_value=max_dt,
-            value=max_dt,
-            format="DD-MM-YYYY HH:mm",
-            key="end_temp_dt_slider"
+        fig = make_subplots(
+            rows=len(DataPlot.SOLARWIND_PANELS), cols=1, shared_xaxes=True, vertical_spacing=0.04,
+            subplot_titles=[title for _, title, _ in DataPlot.SOLARWIND_PANELS]
         )
+        for row, (column, title, label) in enumerate(DataPlot.SOLARWIND_PANELS, start=1):
+            values = df[column].to_numpy(dtype=float)
+            if order is not None:
+                values = values[order]
+            indices = downsample_indices(times, values, DataPlot.MAX_PLOT_POINTS, DataPlot.DOWNSAMPLE_MODE)
+            fig.add_trace(
+                go.Scattergl(x=times[indices], y=values[indices], mode="lines", name=label),
+                row=row, col=1
+            )
+            fig.update_yaxes(title_text=label, row=row, col=1)
 
-        if end_dt < start_dt:
-            st.warning("Data końcowa jest wcześniejsza niż data początkowa!")
-            return None
-
-        mask = (df_plot["time_tag"] >= start_dt) & (df_plot["time_tag"] <= end_dt)
-        df_filtered = df_plot[mask]
-
-        if df_filtered.empty:
-            st.warning("Nie ma danych w wybranym przedziale czasowym.")
-            return None
-
-        fig = px.line(
-            df_filtered,
-            x="time_tag",
-            y="proton_temperature",
-            title="Temperatura protonów w czasie",
-            labels={"time_tag": "Czas", "proton_temperature": "Temperatura (K)"}
-        )
-        fig.update_layout(width=800, height=500)
+        fig.update_xaxes(title_text="Czas", row=len(DataPlot.SOLARWIND_PANELS), col=1)
+        fig.update_layout(height=900, showlegend=False, hovermode="x unified")
 
         return fig
 
     @staticmethod
     def create_goes_flux_line_plot(df):
-        required_columns = {"time_tag", "satellite", "flux"}
+        required_columns = {"satellite", "flux"}
         missing_columns = required_columns - set(df.columns)
+        if not {"time_tag", "time_epoch"} & set(df.columns):
+            missing_columns.add("time_tag")
 
         if missing_columns:
             st.error(f"Brakuje kolumn w danych: {missing_columns}")
             return None
 
-        df_plot = df.copy()
-
-        df_plot["time_tag"] = pd.to_datetime(df_plot["time_tag"], errors="coerce")
-
-        if df_plot.empty or df_plot["time_tag"].isna().all():
-            st.warning("Brak poprawnych danych w 'time_tag' do wyświetlenia wykresu.")
+        if df.empty:
+            st.warning("Brak danych w wybranym przedziale czasowym.")
             return None
 
-        min_dt = df_plot["time_tag"].min().to_pydatetime()
-        max_dt = df_plot["time_tag"].max().to_pydatetime()
-
-        start_dt = st.slider(
-            "Wybierz datę początkową:",
-            min_value=min_dt,
-            max_value=max_dt,
-            value=min_dt,
-            format="DD-MM-YYYY HH:mm",
-            key="start_flux_dt_slider"
-        )
-
-        end_dt = st.slider(
-            "Wybierz datę końcową:",
-            min_value=min_dt,
-            max_value=max_dt,
-            value=max_dt,
-            format="DD-MM-YYYY HH:mm",
-            key="end_flux_dt_slider"
+        df_plot = df.copy()
+        df_plot["time_tag"] = DataPlot.time_column(df_plot)
+
+        # Dwa pasma (flux - długie, flux_short - krótkie) rysujemy jako osobne serie, różniące się linią.
+        band_columns = {"flux": "0.1-0.8 nm", "flux_short": "0.05-0.4 nm"}
+        if "flux_short" in df_plot.columns:
+            df_plot = df_plot.rename(columns=band_columns).melt(
+                id_vars=["time_tag", "satellite"], value_vars=list(band_columns.values()),
+                var_name="band", value_name="flux"
+            ).dropna(subset=["flux"])
+            group = ["satellite", "band"]
+        else:
+            group = "satellite"
+
+        df_plot = downsample_frame(
+            df_plot, "time_tag", "flux", DataPlot.MAX_PLOT_POINTS, DataPlot.DOWNSAMPLE_MODE, group=group
         )
 
-        if end_dt < start_dt:
-            st.warning("Data końcowa jest wcześniejsza niż data początkowa!")
-            return None
-
-        mask = (df_plot["time_tag"] >= start_dt) & (df_plot["time_tag"] <= end_dt)
-        df_filtered = df_plot[mask]
-
-        if df_filtered.empty:
-            st.warning("Brak danych w wybranym przedziale czasowym.")
-            return None
-
         fig = px.line(
-            df_filtered,
+            df_plot,
             x="time_tag",
             y="flux",
             color="satellite",
+            line_dash="band" if "band" in df_plot.columns else None,
             labels={
                 "time_tag": "Czas",
                 "flux": "Natężenie promieniowania (W/m²)",
-                "satellite": "Satelita"
+                "satellite": "Satelita",
+                "band": "Pasmo"
             },
             title="Natężenie promieniowania X-ray GOES-16 i GOES-18 w czasie"
         )
@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Budżet pamięci podręcznej wspólnej dla wszystkich sesji (wyniki zapytań i wykresy w JSON).
+QUERY_CACHE_MB = int(os.getenv("SPACE_WEATHER_QUERY_CACHE_MB", "64"))
+
+
+def _estimate_size(value):
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """Wspólna dla procesu pamięć podręczna LRU z limitem bajtów.
+
+    Klucz zawiera wersję danych tabel (DBManager.get_data_versions), którą podbija
+    każdy zapis ingestii - nowe dane dają nowy klucz, a stare wpisy wypadają z LRU.
+    Dla danego klucza wartość liczy tylko jeden wątek; pozostałe czekają na wynik.
+    """
+
+    def __init__(self, max_bytes=QUERY_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+
+            try:
+                value = compute()
+                with self._lock:
+                    self._store(key, value)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+            return value
+
+    def figure(self, key, build):
+        """Wykres Plotly zapisany jako JSON; zwraca słownik przyjmowany przez st.plotly_chart (lub None)."""
+        serialized = self.get_or_compute(key, lambda: self._serialize_figure(build()))
+        return json.loads(serialized) if serialized is not None else None
+
+    @staticmethod
+    def _serialize_figure(fig):
+        return fig.to_json() if fig is not None else None
+
+    def _store(self, key, value):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache():
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryCache()
+        return _query_cache
@@ -0,0 +1,134 @@
+import os
+import re
+import threading
+from datetime import datetime
+
+from PIL import Image, ImageOps, GifImagePlugin
+
+from app.gif_utils import open_frame
+from app.utils import time_tag_epoch, write_atomic
+
+# Okno animacji, bok klatki i czas wyświetlania klatki (288 klatek/dobę przy obrazie co 5 min).
+ROLLING_WINDOW_SECONDS = int(os.getenv("SPACE_WEATHER_ROLLING_WINDOW", "86400"))
+ROLLING_FRAME_SIZE = int(os.getenv("SPACE_WEATHER_ROLLING_FRAME_SIZE", "256"))
+ROLLING_FRAME_MS = 200
+
+
+class RollingAnimation:
+    """Animacje ostatniej doby dla każdego źródła, aktualizowane o pojedyncze klatki.
+
+    Każda klatka jest kodowana raz do osobnego segmentu GIF (z własną paletą);
+    animacja to nagłówek + segmenty z okna + terminator, więc nowa klatka
+    nie wymaga ponownego kodowania pozostałych.
+    """
+
+    ANIMATION_NAME = "animation.gif"
+
+    def __init__(self, root, window_seconds=ROLLING_WINDOW_SECONDS, frame_size=ROLLING_FRAME_SIZE,
+                 duration_ms=ROLLING_FRAME_MS):
+        self.root = root
+        self.window_seconds = window_seconds
+        self.frame_size = frame_size
+        self.duration_ms = duration_ms
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db):
+        root = os.path.join(os.path.dirname(os.path.abspath(db.db_name)), "rolling_animations")
+        return cls(root)
+
+    @staticmethod
+    def _source_dir_name(source):
+        return re.sub(r"[^A-Za-z0-9]+", "_", source).strip("_").lower()
+
+    def source_dir(self, source):
+        return os.path.join(self.root, self._source_dir_name(source))
+
+    def animation_path(self, source):
+        """Ścieżka gotowej animacji albo None, gdy dla źródła nie ma jeszcze klatek."""
+        path = os.path.join(self.source_dir(source), self.ANIMATION_NAME)
+        return path if os.path.exists(path) else None
+
+    def has_frames(self, source):
+        return bool(self._segments(source))
+
+    @staticmethod
+    def _now_epoch():
+        # Znaczniki czasu obrazów to lokalny czas bez strefy (jak w SolarImageFetcher) - liczymy tak samo.
+        return time_tag_epoch(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    def _segments(self, source):
+        directory = self.source_dir(source)
+        if not os.path.isdir(directory):
+            return []
+        # Nazwa zaczyna się od epoki z zerami wiodącymi - sortowanie nazw jest chronologiczne.
+        return sorted(name for name in os.listdir(directory) if name.endswith(".frame"))
+
+    def encode_frame(self, frame):
+        """Koduje klatkę do bloku GIF (rozszerzenie czasu, deskryptor, lokalna paleta, dane LZW)."""
+        img = open_frame(frame, self.frame_size)
+        img = ImageOps.pad(img, (self.frame_size, self.frame_size), color=(0, 0, 0))
+        quantized = img.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+        return b"".join(GifImagePlugin.getdata(quantized, duration=self.duration_ms, include_color_table=True))
+
+    def _header(self):
+        canvas = Image.new("P", (self.frame_size, self.frame_size))
+        canvas.putpalette([0, 0, 0] * 2)
+        header, _ = GifImagePlugin.getheader(canvas, info={"loop": 0})
+        return b"".join(header)
+
+    def add_frame(self, source, frame, time_tag, image_hash, now=None):
+        """Dopisuje klatkę, usuwa klatki spoza okna i składa animację; zwraca liczbę klatek."""
+        return self.add_frames(source, [(frame, time_tag, image_hash)], now)
+
+    def expire(self, source, now=None):
+        """Usuwa klatki spoza okna bez dopisywania nowej - gdy źródło nie dostarcza obrazów."""
+        with self._lock:
+            return self._assemble(source, now, rewrite=False)
+
+    def add_frames(self, source, frames, now=None):
+        directory = self.source_dir(source)
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            for frame, time_tag, image_hash in frames:
+                name = f"{time_tag_epoch(time_tag):012d}_{image_hash[:16]}.frame"
+                path = os.path.join(directory, name)
+                if os.path.exists(path):
+                    continue
+                try:
+                    write_atomic(path, self.encode_frame(frame))
+                except Exception as e:
+                    print(f"Błąd kodowania klatki animacji ({source}):", e)
+            return self._assemble(source, now)
+
+    def _assemble(self, source, now=None, rewrite=True):
+        directory = self.source_dir(source)
+        segments = self._segments(source)
+        if not segments:
+            return 0
+
+        # Okno liczymy od bieżącego czasu, nie od najnowszej klatki - inaczej przerwa
+        # w dostawie obrazów zostawiałaby na stronie klatki sprzed wielu dni.
+        cutoff = (self._now_epoch() if now is None else now) - self.window_seconds
+        kept = []
+        for name in segments:
+            if int(name.split("_", 1)[0]) <= cutoff:
+                os.remove(os.path.join(directory, name))
+            else:
+                kept.append(name)
+
+        animation = os.path.join(directory, self.ANIMATION_NAME)
+        if not kept:
+            if os.path.exists(animation):
+                os.remove(animation)
+            return 0
+        if not rewrite and len(kept) == len(segments):
+            return len(kept)
+
+        parts = [self._header()]
+        for name in kept:
+            with open(os.path.join(directory, name), "rb") as f:
+                parts.append(f.read())
+        parts.append(b";")
+        write_atomic(animation, b"".join(parts))
+        return len(kept)
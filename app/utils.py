@@ -0,0 +1,26 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+
+
+def time_tag_epoch(time_tag):
+    """Sekundy od epoki dla tekstowego time_tag (ISO, także z "Z"); czas bez strefy traktujemy jako UTC."""
+    parsed = datetime.fromisoformat(time_tag.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def write_atomic(path, data):
+    """Zapis przez plik tymczasowy w tym samym katalogu i os.replace - czytelnik nie zobaczy połowy pliku."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,61 @@
+"""Czas kodowania i rozmiar animacji GIF, WebP i APNG z tych samych klatek.
+
+Uruchomienie: python -m benchmarks.bench_animation_formats [katalog_z_jpg | liczba_klatek]
+
+Bez katalogu klatki są syntetyczne (gradient radialny z szumem, zbliżony do obrazów koronografu).
+"""
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from PIL import Image, ImageChops
+
+from app import gif_utils
+
+VARIANTS = [
+    ("GIF", "gif", {}),
+    ("WebP q=60", "webp", {"quality": 60}),
+    ("WebP q=80", "webp", {"quality": 80}),
+    ("WebP q=95", "webp", {"quality": 95}),
+    ("WebP bezstratny", "webp", {"lossless": True}),
+    ("APNG", "apng", {})
+]
+
+
+def make_frames(directory, count, size=1024):
+    gradient = Image.radial_gradient("L").resize((size, size)).convert("RGB")
+    paths = []
+    for i in range(count):
+        noise = Image.effect_noise((size, size), 20 + i % 30).convert("RGB")
+        path = os.path.join(directory, f"frame_{i:04d}.jpg")
+        ImageChops.add(ImageChops.invert(gradient), noise, scale=2.0).save(path, quality=85)
+        paths.append(path)
+    return paths
+
+
+def run(frames):
+    print(f"{len(frames)} klatek -> {gif_utils.MAX_GIF_SIZE} px")
+    print(f"{'format':<16} {'czas [s]':>9} {'rozmiar [kB]':>13}")
+    for name, fmt, params in VARIANTS:
+        buffer = BytesIO()
+        start = time.perf_counter()
+        gif_utils.write_animation(frames, buffer, fmt, workers=1, **params)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16} {elapsed:9.2f} {len(buffer.getvalue()) / 1024:13.0f}")
+
+
+def main():
+    arg = sys.argv[1] if len(sys.argv) > 1 else "60"
+    if os.path.isdir(arg):
+        frames = sorted(os.path.join(arg, name) for name in os.listdir(arg) if name.lower().endswith(".jpg"))
+        run(frames)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run(make_frames(tmp, int(arg)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Pamięć na próbkę i czas odczytu zakresu wiatru słonecznego: krotki + DataFrame kontra kolumny NumPy.
+
+Uruchomienie: python -m benchmarks.bench_columnar_fetch [liczba_próbek]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from app.db_manager import DBManager
+
+
+def seed(db, count):
+    start = datetime(2025, 1, 1)
+    rows = [
+        ((start + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S"), "DSCOVR", 400.0 + i % 300, 5.0, 100000)
+        for i in range(count)
+    ]
+    db.insert_solarwind_batch(rows)
+    return start, start + timedelta(minutes=count)
+
+
+def tuples_frame(db, start, end):
+    rows = db._fetchall(*db._solarwind_range_query(start, end))
+    return pd.DataFrame(rows, columns=["time_epoch", "proton_speed", "proton_density", "proton_temperature"])
+
+
+def columnar_frame(db, start, end):
+    return pd.DataFrame(db.get_solarwind_columns(start, end))
+
+
+def measure(build, db, start, end, count):
+    tracemalloc.start()
+    began = time.perf_counter()
+    df = build(db, start, end)
+    elapsed = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / count, df.memory_usage(deep=True).sum() / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "bench.db"))
+        start, end = seed(db, count)
+        print(f"{count} próbek wiatru słonecznego")
+        print(f"{'metoda':<18} {'czas [s]':>9} {'szczyt B/próbkę':>16} {'ramka B/próbkę':>15}")
+        for name, build in (("krotki + DataFrame", tuples_frame), ("kolumny NumPy", columnar_frame)):
+            elapsed, peak, frame = measure(build, db, start, end, count)
+            print(f"{name:<18} {elapsed:9.2f} {peak:16.0f} {frame:15.0f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
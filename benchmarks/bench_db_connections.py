@@ -0,0 +1,86 @@
+"""Porównanie przepustowości: nowe połączenie na każde wywołanie vs pula DBManager.
+
+Uruchomienie: python -m benchmarks.bench_db_connections [liczba_operacji]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.db_manager import DBManager
+
+# Obie strony wykonują te same zapytania - mierzymy tylko koszt połączeń (i tryb WAL).
+INSERT_SQL = """
+    INSERT INTO solarwind (time_tag, proton_speed, proton_density, proton_temperature)
+    VALUES (?, ?, ?, ?)
+"""
+EXISTS_SQL = "SELECT 1 FROM solarwind WHERE time_tag = ?"
+
+
+def per_call_insert(db_name, time_tag):
+    conn = sqlite3.connect(db_name)
+    c = conn.cursor()
+    c.execute(INSERT_SQL, (time_tag, 400.0, 5.0, 100000))
+    conn.commit()
+    conn.close()
+
+
+def per_call_exists(db_name, time_tag):
+    conn = sqlite3.connect(db_name)
+    c = conn.cursor()
+    c.execute(EXISTS_SQL, (time_tag,))
+    row = c.fetchone()
+    conn.close()
+    return row is not None
+
+
+def pooled_insert(db, time_tag):
+    with db._transaction() as c:
+        c.execute(INSERT_SQL, (time_tag, 400.0, 5.0, 100000))
+
+
+def pooled_exists(db, time_tag):
+    return db._fetchone(EXISTS_SQL, (time_tag,)) is not None
+
+
+def run(label, n, insert, exists):
+    start = time.perf_counter()
+    for i in range(n):
+        time_tag = (datetime(2025, 1, 1) + timedelta(minutes=i)).isoformat()
+        if not exists(time_tag):
+            insert(time_tag)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {n} x (check + insert): {elapsed:7.3f} s  {2 * n / elapsed:10.0f} ops/s")
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_db = os.path.join(tmp, "baseline.db")
+        DBManager(baseline_db).close()
+        conn = sqlite3.connect(baseline_db)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        baseline = run(
+            "per-call connections", n,
+            lambda t: per_call_insert(baseline_db, t),
+            lambda t: per_call_exists(baseline_db, t)
+        )
+
+        db = DBManager(os.path.join(tmp, "pooled.db"))
+        pooled = run(
+            "pooled (WAL)", n,
+            lambda t: pooled_insert(db, t),
+            lambda t: pooled_exists(db, t)
+        )
+        db.close()
+
+    print(f"speed-up: {baseline / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
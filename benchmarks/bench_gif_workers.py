@@ -0,0 +1,47 @@
+"""Czas budowy animacji w zależności od liczby procesów przygotowujących klatki.
+
+Uruchomienie: python -m benchmarks.bench_gif_workers [liczba_klatek] [maks_procesów]
+"""
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from app import gif_utils
+
+
+def make_frames(directory, count, size=1024):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"frame_{i:04d}.jpg")
+        Image.effect_noise((size, size), 30 + i % 40).convert("RGB").save(path, quality=85)
+        paths.append(path)
+    return paths
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    cpus = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, 16, cpus} & set(range(1, cpus + 1)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        frames = make_frames(tmp, count)
+        print(f"{count} klatek 1024 px -> {gif_utils.MAX_GIF_SIZE} px, CPU: {cpus}")
+
+        baseline = None
+        for workers in worker_counts:
+            # Pula jest tworzona raz na proces; rozgrzewamy ją, by nie mierzyć startu procesów.
+            gif_utils.write_gif(frames[:gif_utils.MIN_FRAMES_FOR_POOL], BytesIO(), workers=workers)
+
+            start = time.perf_counter()
+            gif_utils.write_gif(frames, BytesIO(), workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"workers={workers:<3} {elapsed:7.2f} s  speed-up {baseline / elapsed:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
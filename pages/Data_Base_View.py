@@ -1,27 +1,57 @@
 import streamlit as st
 import pandas as pd
 from app.db_manager import DBManager
+from app.plot import DataPlot
+
+PAGE_SIZES = [50, 100, 500, 1000]
+
 
 def show_database_contents():
     st.subheader("Podgląd zawartości bazy danych")
 
     db = DBManager()
 
-    table_choice = st.selectbox("Wybierz tabelę do podglądu:", ["xray", "solarwind", "solar_images", "goes_data"])
+    table_choice = st.selectbox("Wybierz tabelę do podglądu:", list(DBManager.BROWSABLE_TABLES))
+    page_size = st.selectbox("Wierszy na stronę:", PAGE_SIZES, index=1)
+
+    # Kursor strony: ("before", id) - starsze wiersze, ("after", id) - nowsze, None - najnowsze.
+    cursor_key = f"browse_cursor_{table_choice}"
+    cursor = st.session_state.get(cursor_key)
+    before_id = cursor[1] if cursor and cursor[0] == "before" else None
+    after_id = cursor[1] if cursor and cursor[0] == "after" else None
 
-    rows, columns = db.get_all_from_table(table_choice)
+    rows, columns = db.browse_table(table_choice, limit=page_size, before_id=before_id, after_id=after_id)
+    if cursor is not None and (not rows or (after_id is not None and len(rows) < page_size)):
+        # Dotarliśmy do najnowszych wierszy (lub poza zakres) - pełna pierwsza strona.
+        st.session_state[cursor_key] = cursor = after_id = None
+        rows, columns = db.browse_table(table_choice, limit=page_size)
+
+    st.caption(f"Wierszy w tabeli: {db.count_rows(table_choice)}")
 
     if rows:
         df = pd.DataFrame(rows, columns=columns)
 
         if table_choice == "goes_data":
-            scientific_columns = ["flux", "observed_flux", "electron_correction"]
-
-            for col in scientific_columns:
-                if col in df.columns:
-                    df[col] = df[col].apply(lambda x: f"{x:.2e}" if pd.notnull(x) else x)
+            DataPlot.format_numbers(df, [
+                column for column in df.columns
+                if column.startswith(("flux", "observed_flux", "electron_correction"))
+            ])
 
         st.dataframe(df)
+
+        first_id, last_id = rows[0][0], rows[-1][0]
+        at_newest = cursor is None
+        at_oldest = after_id is None and len(rows) < page_size
+        col_newest, col_newer, col_older = st.columns(3)
+        if col_newest.button("⏮ Najnowsze", disabled=at_newest):
+            st.session_state[cursor_key] = None
+            st.rerun()
+        if col_newer.button("◀ Nowsze", disabled=at_newest):
+            st.session_state[cursor_key] = ("after", first_id)
+            st.rerun()
+        if col_older.button("Starsze ▶", disabled=at_oldest):
+            st.session_state[cursor_key] = ("before", last_id)
+            st.rerun()
     else:
         st.info(f"Brak danych w tabeli: {table_choice}")
 
@@ -1,19 +1,63 @@
+import base64
+import os
+
 import streamlit as st
-import pandas as pd
 from datetime import date, timedelta
 
+from app.animation_cache import AnimationCache
 from app.db_manager import DBManager
-from app.gif_utils import create_gif_in_memory
+from app.gif_utils import (create_animation_in_memory, ANIMATION_FORMATS, MAX_GIF_FRAMES, MAX_GIF_SIZE,
+                           WEBP_QUALITY)
+from app.rolling_animation import RollingAnimation
+
+ANIMATION_CACHE_MB = int(os.getenv("SPACE_WEATHER_ANIMATION_CACHE_MB", "512"))
+
+
+def get_animation_cache(db):
+    root = os.path.join(os.path.dirname(os.path.abspath(db.db_name)), "animation_cache")
+    return AnimationCache(root, max_bytes=ANIMATION_CACHE_MB * 1024 * 1024)
+
+
+FORMAT_LABELS = {"GIF": "gif", "WebP": "webp", "APNG": "apng"}
+
+
+def show_animation(animation, fmt, caption):
+    if fmt != "webp":
+        # "PNG" zachowuje klatki APNG - w trybie auto Streamlit przekodowałby plik do pojedynczego obrazu.
+        st.image(animation, caption=caption, use_container_width=True,
+                 output_format="PNG" if fmt == "apng" else "auto")
+        return
+
+    # st.image zamienia WebP na JPEG (pierwsza klatka), więc animacja trafia do <img> jako data URI.
+    if isinstance(animation, str):
+        with open(animation, "rb") as f:
+            data = f.read()
+    else:
+        data = animation.getvalue()
+    encoded = base64.b64encode(data).decode("ascii")
+    st.markdown(f"<img src='data:{ANIMATION_FORMATS[fmt][2]};base64,{encoded}' style='width: 100%;'>",
+                unsafe_allow_html=True)
+    st.caption(caption)
 
 
 def show_solar_gif_page():
-    st.title("Tworzenie GIF-a (Pillow) z bazy")
+    st.title("Tworzenie animacji (Pillow) z bazy")
 
     db = DBManager()
 
     possible_sources = ["SOHO LASCO C2", "SOHO LASCO C3", "SDO HMI Continuum"]
     source = st.selectbox("Wybierz źródło:", possible_sources)
 
+    st.subheader("Ostatnie 24 h")
+    # Animacja utrzymywana przez ingestię - wyświetlana bez budowania.
+    rolling_path = RollingAnimation.for_database(db).animation_path(source)
+    if rolling_path:
+        st.image(rolling_path, caption=f"{source} – ostatnie 24 h", use_container_width=True)
+    else:
+        st.info("Animacja ostatnich 24 h nie jest jeszcze gotowa.")
+
+    st.subheader("Własny zakres")
+
     end_date_default = date.today()
     start_date_default = end_date_default - timedelta(days=1)
 
@@ -38,27 +82,50 @@ def show_solar_gif_page():
         min_value=100, max_value=5000, value=500, step=100
     )
 
-    if st.button("Utwórz GIF"):
-        rows = db.get_solar_images_for_sources_in_range(start_str, end_str, [source])
-        if not rows:
+    max_frames = st.slider(
+        "Maksymalna liczba klatek (próbkowane równomiernie):",
+        min_value=10, max_value=2 * MAX_GIF_FRAMES, value=MAX_GIF_FRAMES, step=10
+    )
+
+    fmt = FORMAT_LABELS[st.radio("Format animacji:", list(FORMAT_LABELS), horizontal=True)]
+    quality, lossless = WEBP_QUALITY, False
+    if fmt == "webp":
+        lossless = st.checkbox("Bezstratnie", value=False)
+        if not lossless:
+            quality = st.slider("Jakość WebP:", min_value=10, max_value=100, value=WEBP_QUALITY, step=5)
+
+    if st.button("Utwórz animację"):
+        latest_hash, frame_count = db.get_image_range_signature(start_str, end_str, source)
+        if not frame_count:
             st.warning("Brak obrazów w wybranym przedziale.")
             return
 
-        df = pd.DataFrame(rows, columns=["source", "image", "time_tag"])
-        df["time_tag"] = pd.to_datetime(df["time_tag"], errors="coerce")
-        df = df.sort_values("time_tag")
-
-        images_data_list = df["image"].tolist()
-        if len(images_data_list) < 2:
+        if frame_count < 2:
             st.warning("Znaleziono tylko 1 klatkę – animacja się nie uda.")
             return
 
-        gif_buffer = create_gif_in_memory(images_data_list, duration_ms=frame_ms)
-        if gif_buffer is None:
-            st.error("Nie udało się utworzyć GIF-a (za mało klatek?).")
+        cache = get_animation_cache(db)
+        cache_key = AnimationCache.make_key(
+            source=source, start=start_str, end=end_str, duration_ms=frame_ms, max_size=MAX_GIF_SIZE,
+            max_frames=max_frames, latest_hash=latest_hash, frame_count=frame_count,
+            fmt=fmt, quality=quality, lossless=lossless
+        )
+        ext = ANIMATION_FORMATS[fmt][1]
+        cached_path = cache.get(cache_key, ext)
+        if cached_path is not None:
+            st.success("Animacja z pamięci podręcznej.")
+            show_animation(cached_path, fmt, f"Animacja z {source}")
+            return
+
+        frames = db.get_solar_image_frames_in_range(start_str, end_str, source, max_size=MAX_GIF_SIZE)
+        buffer = create_animation_in_memory(frames, fmt=fmt, duration_ms=frame_ms, max_frames=max_frames,
+                                            quality=quality, lossless=lossless)
+        if buffer is None:
+            st.error("Nie udało się utworzyć animacji (za mało klatek?).")
         else:
-            st.success("GIF utworzony w pamięci (Pillow).")
-            st.image(gif_buffer, caption=f"Animacja z {source}", use_container_width=True)
+            cache.put(cache_key, buffer.getvalue(), ext)
+            st.success("Animacja utworzona w pamięci (Pillow).")
+            show_animation(buffer, fmt, f"Animacja z {source}")
 
 
 show_solar_gif_page()
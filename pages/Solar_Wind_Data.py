@@ -6,24 +6,28 @@ from app.db_manager import DBManager
 
 
 st.title("Dane wiatru słonecznego")
-def show_solar_wind_data():
-    db = DBManager()
-    rows = db.get_recent_solarwind(limit=None)
+def load_solar_wind_range(db, bounds, key):
+    time_range = DataPlot.select_time_range(bounds, key)
+    if time_range is None:
+        return None
 
-    df_sw = pd.DataFrame(rows, columns=["ID", "time_tag", "proton_speed", "proton_density", "proton_temperature"])
-    df_sw.drop(columns=["ID"], inplace=True, errors='ignore')
+    resolution = db.choose_rollup_resolution(*time_range, DataPlot.MAX_PLOT_POINTS)
+    return pd.DataFrame(db.get_solarwind_columns(*time_range, resolution=resolution))
 
-    fig_speed = DataPlot.create_solarwind_speed_line_plot(df_sw)
-    if fig_speed:
-        st.plotly_chart(fig_speed, use_container_width=True)
+def show_solar_wind_data():
+    db = DBManager()
+    bounds = db.get_solarwind_time_bounds()
+    if not bounds or bounds[0] is None:
+        st.warning("Brak danych wiatru słonecznego w bazie.")
+        return
 
-    fig_density = DataPlot.create_solarwind_density_line_plot(df_sw)
-    if fig_density:
-        st.plotly_chart(fig_density, use_container_width=True)
+    df_sw = load_solar_wind_range(db, bounds, "solarwind")
+    if df_sw is None:
+        return
 
-    fig_temp = DataPlot.create_solarwind_temp_line_plot(df_sw)
-    if fig_temp:
-        st.plotly_chart(fig_temp, use_container_width=True)
+    fig = DataPlot.create_solarwind_panel_plot(df_sw)
+    if fig:
+        st.plotly_chart(fig, use_container_width=True)
 
 
-show_solar_wind_data()
\ No newline at end of file
+show_solar_wind_data()
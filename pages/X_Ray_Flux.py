@@ -8,24 +8,19 @@ st.title("Natężenie promieniowania X-Ray (GOES)")
 
 def show_x_ray_flux_data():
     db = DBManager()
-    rows = db.get_recent_goes_data(limit=None)
+    bounds = db.get_goes_time_bounds()
 
-    if not rows:
+    if not bounds or bounds[0] is None:
         st.warning("Brak danych GOES w bazie.")
         return
 
-    df_sw = pd.DataFrame(rows, columns=[
-        "id",
-        "time_tag",
-        "satellite",
-        "flux",
-        "observed_flux",
-        "electron_correction",
-        "electron_contamination",
-        "energy"
-    ])
-
-    df_sw.drop(columns=["id"], inplace=True, errors='ignore')
+    time_range = DataPlot.select_time_range(bounds, "flux")
+    if time_range is None:
+        return
+
+    resolution = db.choose_rollup_resolution(*time_range, DataPlot.MAX_PLOT_POINTS)
+    # Dla rozbłysków liczy się szczyt, więc z agregatów bierzemy maksimum kubełka.
+    df_sw = pd.DataFrame(db.get_goes_flux_columns(*time_range, resolution=resolution, stat="max"))
 
     fig_x_ray_flux = DataPlot.create_goes_flux_line_plot(df_sw)
     if fig_x_ray_flux:
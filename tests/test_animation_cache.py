@@ -0,0 +1,25 @@
+import os
+
+from app.animation_cache import AnimationCache
+
+
+def test_key_changes_with_latest_image_hash():
+    params = dict(source="SOHO LASCO C2", start="2025-01-13 00:00:00", end="2025-01-13 23:59:59", duration_ms=500)
+
+    assert AnimationCache.make_key(latest_hash="aa", **params) == AnimationCache.make_key(latest_hash="aa", **params)
+    assert AnimationCache.make_key(latest_hash="aa", **params) != AnimationCache.make_key(latest_hash="bb", **params)
+
+
+def test_least_recently_used_entries_are_evicted_over_budget(tmp_path):
+    cache = AnimationCache(str(tmp_path), max_bytes=250)
+
+    for i, key in enumerate(["a", "b", "c"]):
+        path = cache.put(key, b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+    assert cache.get("a") is None
+
+    os.utime(cache.get("b"))
+    cache.put("d", b"x" * 100)
+
+    assert cache.get("c") is None
+    assert cache.get("b") is not None and cache.get("d") is not None
@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.data_fetcher import JSONFeedFetcher, SolarImageFetcher, create_session, fetch_concurrently
+
+
+LAST_MODIFIED = "Mon, 13 Jan 2025 10:15:00 GMT"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/slow"):
+            time.sleep(0.5)
+        if self.path.endswith(".json"):
+            body = json.dumps([{"time_tag": "2025-01-13T10:15:00", "path": self.path}]).encode()
+            content_type = "application/json"
+        elif self.path.endswith(".jpg"):
+            body = b"\xff\xd8" + self.path.encode() + b"\xff\xd9"
+            content_type = "image/jpeg"
+        else:
+            self.send_error(404)
+            return
+
+        etag = f'"{len(body)}-{hash(body)}"'
+        if self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if "/etag/" in self.path:
+            self.send_header("ETag", etag)
+        if "/modified/" in self.path:
+            self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.body_bytes += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.body_bytes = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_concurrently_takes_as_long_as_the_slowest_source(stub_server):
+    session = create_session()
+    tasks = {
+        f"feed{i}": JSONFeedFetcher(f"{stub_server.url}/slow/feed{i}.json", session).fetch_data
+        for i in range(4)
+    }
+    tasks["missing"] = JSONFeedFetcher(f"{stub_server.url}/missing", session).fetch_data
+
+    start = time.perf_counter()
+    results = fetch_concurrently(tasks, deadline=5)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 1.5
+    assert results["feed3"].value[0]["path"] == "/slow/feed3.json"
+    assert results["missing"].value is None
+    assert results["missing"].error is not None
+
+
+def test_fetch_concurrently_reports_deadline_per_source(stub_server):
+    session = create_session()
+    results = fetch_concurrently({
+        "fast": JSONFeedFetcher(f"{stub_server.url}/fast.json", session).fetch_data,
+        "slow": JSONFeedFetcher(f"{stub_server.url}/slow.json", session).fetch_data,
+    }, deadline=0.2)
+
+    assert results["fast"].error is None
+    assert isinstance(results["slow"].error, TimeoutError)
+
+
+def test_solar_images_are_fetched_in_parallel(stub_server):
+    fetcher = SolarImageFetcher(session=create_session())
+    fetcher.image_sources = {f"src{i}": f"{stub_server.url}/slow/{i}.jpg" for i in range(3)}
+
+    start = time.perf_counter()
+    images = fetcher.fetch_images()
+
+    assert time.perf_counter() - start < 1.2
+    assert [img["source"] for img in images] == ["src0", "src1", "src2"]
+    assert images[0]["image_hash"] == SolarImageFetcher.calculate_image_hash(b"\xff\xd8/slow/0.jpg\xff\xd9")
+
+
+def test_unchanged_feed_is_not_downloaded_again(stub_server):
+    fetcher = JSONFeedFetcher(f"{stub_server.url}/etag/feed.json", create_session())
+
+    assert fetcher.fetch_data()[0]["path"] == "/etag/feed.json"
+    fetcher.commit()
+    downloaded = stub_server.body_bytes
+
+    assert fetcher.fetch_data() is None
+    assert stub_server.body_bytes == downloaded
+
+
+def test_feed_is_downloaded_again_until_its_data_is_committed(stub_server):
+    fetcher = JSONFeedFetcher(f"{stub_server.url}/etag/feed.json", create_session())
+
+    # Zapis pobranych danych się nie udał (brak commit) - kolejna próba pobiera je ponownie.
+    assert fetcher.fetch_data() is not None
+    assert fetcher.fetch_data() is not None
+    fetcher.commit()
+    assert fetcher.fetch_data() is None
+
+
+def test_unchanged_images_skip_download_and_hashing(stub_server, monkeypatch):
+    fetcher = SolarImageFetcher(session=create_session())
+    fetcher.image_sources = {
+        "etag": f"{stub_server.url}/etag/c2.jpg",
+        "modified": f"{stub_server.url}/modified/c3.jpg",
+    }
+    for img in fetcher.fetch_images():
+        fetcher.commit(img["source"])
+    downloaded = stub_server.body_bytes
+
+    hashed = []
+    monkeypatch.setattr(SolarImageFetcher, "calculate_image_hash", staticmethod(hashed.append))
+    assert fetcher.fetch_images() == []
+    assert hashed == []
+    assert stub_server.body_bytes == downloaded
@@ -1,3 +1,8 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
 import pytest
 from app.db_manager import DBManager
 
@@ -7,6 +12,23 @@ def db(tmp_path):
     mgr = DBManager(str(p))
     return mgr
 
+def create_legacy_solarwind(path, rows):
+    """Baza z tabelą solarwind w pierwotnym schemacie (bez source i time_epoch)."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE solarwind (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            time_tag TEXT NOT NULL,
+            proton_speed REAL,
+            proton_density REAL,
+            proton_temperature INTEGER
+        )
+    """)
+    conn.executemany("INSERT INTO solarwind (time_tag, proton_speed, proton_density, proton_temperature) "
+                     "VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
 def test_insert_and_get_one_solarwind(db):
     ts = "2025-01-13 10:15:00"
     db.insert_solarwind(ts, proton_speed=400.5, proton_density=10.2, proton_temperature=123456)
@@ -29,3 +51,375 @@ def test_no_duplicates_on_check_exists(db):
 
     db.insert_solarwind(ts, 200, 2.5, 60000)
     assert db.check_solarwind_exists(ts)
+
+def test_pool_reuses_connection_in_wal_mode(db):
+    with db.pool.connection() as conn:
+        first = conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    db.insert_solarwind("2025-01-13 12:00:00", 300, 1.0, 40000)
+
+    with db.pool.connection() as conn:
+        assert conn is first
+
+def test_failed_transaction_rolls_back(db):
+    with pytest.raises(RuntimeError):
+        with db._transaction() as c:
+            c.execute("INSERT INTO solarwind (time_tag) VALUES (?)", ("2025-01-13 13:00:00",))
+            raise RuntimeError("boom")
+
+    assert not db.check_solarwind_exists("2025-01-13 13:00:00")
+
+def test_goes_batch_insert_reports_inserted_merged_and_skipped(db):
+    rows = [
+        ("2025-01-13T10:00:00Z", 16, 2e-7, 2e-7, 0.0, False, 1e-6, 1e-6, 0.0, False),
+        ("2025-01-13T10:00:00Z", 18, None, None, None, None, 1.1e-6, 1.1e-6, 0.0, False),
+    ]
+    assert db.insert_goes_data_batch(rows) == (2, 0, 0)
+    assert db.insert_goes_data_batch(rows) == (0, 0, 2)
+    versions = db.get_data_versions()
+
+    # Krótkie pasmo satelity 18 przychodzi w późniejszym odpytaniu i uzupełnia istniejący wiersz.
+    late_band = [("2025-01-13T10:00:00Z", 18, 3e-7, 3e-7, 0.0, False, None, None, None, None)]
+    assert db.insert_goes_data_batch(late_band) == (0, 1, 0)
+    assert db.get_data_versions()["goes_data"] == versions["goes_data"] + 1
+    assert db._fetchone("SELECT flux_short, flux_long FROM goes_data WHERE satellite = 18") == (3e-7, 1.1e-6)
+    rollup = db.get_goes_rollup(300, "2025-01-13T10:00:00Z", "2025-01-13T10:04:00Z")
+    assert rollup[1] == (1736762400, 18, 1.1e-6, 3e-7)
+
+    columns = {column: [value] for column, value in zip(
+        DBManager.GOES_DATA_COLUMNS,
+        ("2025-01-13T10:01:00Z", 16, 4e-7, 4e-7, 0.0, False, 3e-6, 3e-6, 0.0, False)
+    )}
+    assert db.insert_goes_data_batch(columns) == (1, 0, 0)
+    assert len(db.get_recent_goes_data(limit=None)) == 3
+
+def test_goes_batch_advances_high_water_marks(db):
+    assert db.get_high_water_marks("goes_data") == {}
+
+    db.insert_goes_data_batch([
+        ("2025-01-13T10:00:00Z", 16, None, None, None, None, 1e-6, 1e-6, 0.0, False),
+        ("2025-01-13T10:01:00Z", 16, None, None, None, None, 1e-6, 1e-6, 0.0, False),
+        ("2025-01-13T10:00:00Z", 18, None, None, None, None, 1e-6, 1e-6, 0.0, False),
+    ])
+    db.insert_goes_data_batch([
+        ("2025-01-13T09:59:00Z", 16, None, None, None, None, 1e-6, 1e-6, 0.0, False),
+    ])
+
+    assert db.get_high_water_marks("goes_data") == {
+        "16/long": "2025-01-13T10:01:00Z",
+        "18/long": "2025-01-13T10:00:00Z",
+    }
+
+def test_solarwind_batch_deduplicates_by_time_tag_and_source(db):
+    rows = [
+        ("2025-01-13T10:00:00", "DSCOVR", 400.0, 5.0, 100000),
+        ("2025-01-13T10:01:00", "DSCOVR", 410.0, 5.5, 110000),
+    ]
+    assert db.insert_solarwind_batch(rows) == (2, 0)
+    assert db.insert_solarwind_batch(rows + [("2025-01-13T10:02:00", "DSCOVR", 420.0, 6.0, 120000)]) == (1, 2)
+
+    assert len(db.get_recent_solarwind(limit=None)) == 3
+    assert db.get_high_water_marks("solarwind") == {"DSCOVR": "2025-01-13T10:02:00"}
+
+def test_migrations_upgrade_existing_database(tmp_path):
+    path = tmp_path / "legacy.db"
+    create_legacy_solarwind(path, [("2025-01-13T09:00:00", 350.0, None, None)])
+
+    db = DBManager(str(path))
+    assert db.insert_solarwind_batch([("2025-01-13T09:01:00", "DSCOVR", 360.0, 4.0, 90000)]) == (1, 0)
+    assert len(db.get_recent_solarwind(limit=None)) == 2
+    assert db._fetchone("PRAGMA user_version")[0] == len(DBManager.MIGRATIONS)
+    # Stare wiersze dostają time_epoch z migracji, nowe - przy zapisie.
+    assert db._fetchall("SELECT time_epoch FROM solarwind ORDER BY id") == [(1736758800,), (1736758860,)]
+
+def test_solarwind_rows_from_before_source_column_are_not_duplicated(tmp_path):
+    path = tmp_path / "legacy.db"
+    rows = [(f"2025-01-13T10:0{minute}:00", "DSCOVR", 400.0, 5.0, 100000) for minute in range(3)]
+    create_legacy_solarwind(path, [(row[0],) + row[2:] for row in rows])
+
+    db = DBManager(str(path))
+    assert db.insert_solarwind_batch(rows + [("2025-01-13T10:03:00", "DSCOVR", 410.0, 5.0, 100000)]) == (1, 3)
+    assert len(db.get_recent_solarwind(limit=None)) == 4
+    assert db._fetchone("SELECT sample_count FROM solarwind_rollup WHERE resolution = 300") == (4,)
+
+def test_migration_removes_solarwind_duplicates_of_legacy_rows(tmp_path):
+    source = DBManager(str(tmp_path / "source.db"))
+    source.insert_solarwind("2025-01-13T10:00:00", 400.0, 5.0, 100000)
+    with source._transaction() as c:
+        # Stan po pierwszej ingestii na starszej wersji: ta sama minuta drugi raz, już ze źródłem.
+        c.execute("INSERT INTO solarwind (time_tag, source, proton_speed, time_epoch) "
+                  "VALUES ('2025-01-13T10:00:00', 'DSCOVR', 400.0, 1736762400)")
+        c.execute("INSERT OR REPLACE INTO solarwind_rollup (resolution, bucket, sample_count) VALUES (300, 1736762400, 2)")
+        c.execute(f"PRAGMA user_version = {len(DBManager.MIGRATIONS) - 1}")
+
+    path = tmp_path / "upgraded.db"
+    with source.pool.connection() as conn, sqlite3.connect(path) as target:
+        conn.backup(target)
+
+    db = DBManager(str(path))
+    assert db._fetchall("SELECT source FROM solarwind") == [(None,)]
+    assert db._fetchall("SELECT sample_count FROM solarwind_rollup") == [(1,), (1,), (1,)]
+
+def test_goes_migration_merges_energy_bands_into_one_row(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE goes_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            time_tag TEXT NOT NULL,
+            satellite INTEGER,
+            flux REAL,
+            observed_flux REAL,
+            electron_correction REAL,
+            electron_contamination BOOLEAN,
+            energy TEXT
+        )
+    """)
+    conn.executemany("""
+        INSERT INTO goes_data (time_tag, satellite, flux, observed_flux, electron_correction,
+                               electron_contamination, energy)
+        VALUES (?, ?, ?, ?, 0.0, 0, ?)
+    """, [
+        ("2025-01-13T10:00:00Z", 16, 1e-6, 1.1e-6, "0.1-0.8nm"),
+        ("2025-01-13T10:00:00Z", 16, 2e-7, 2.1e-7, "0.05-0.4nm"),
+        ("2025-01-13T10:00:00Z", 18, 3e-6, 3.1e-6, "0.1-0.8nm"),
+    ])
+    conn.commit()
+    conn.close()
+
+    db = DBManager(str(path))
+    assert db.get_recent_goes_data(limit=None) == [
+        (2, "2025-01-13T10:00:00Z", 18, None, None, None, None, 3e-6, 3.1e-6, 0.0, 0),
+        (1, "2025-01-13T10:00:00Z", 16, 2e-7, 2.1e-7, 0.0, 0, 1e-6, 1.1e-6, 0.0, 0),
+    ]
+    assert db.get_goes_rollup(300, "2025-01-13T10:00:00Z", "2025-01-13T10:05:00Z") == [
+        (1736762400, 16, 1e-6, 2e-7),
+        (1736762400, 18, 3e-6, None),
+    ]
+
+def test_fresh_database_creates_current_goes_schema(db):
+    columns = [row[1] for row in db._fetchall("PRAGMA table_info(goes_data)")]
+    assert columns == ["id", *DBManager.GOES_DATA_COLUMNS, "time_epoch"]
+
+def test_insert_goes_data_fills_columns_of_its_band(db):
+    db.insert_goes_data("2025-01-13T10:00:00Z", 16, 1e-6, 1e-6, 0.0, False, "0.1-0.8nm")
+    db.insert_goes_data("2025-01-13T10:00:00Z", 16, 2e-7, 2e-7, 0.0, False, "0.05-0.4nm")
+
+    (row,) = db.get_recent_goes_data(limit=None)
+    assert row[3] == 2e-7 and row[7] == 1e-6
+    with pytest.raises(ValueError):
+        db.insert_goes_data("2025-01-13T10:00:00Z", 16, 1e-6, 1e-6, 0.0, False, "1-8A")
+
+def test_backfilled_solarwind_is_ordered_by_time(db):
+    db.insert_solarwind_batch([("2025-01-13T10:05:00", "DSCOVR", 500.0, 5.0, 100000)])
+    db.insert_solarwind_batch([
+        ("2025-01-13T10:04:00", "DSCOVR", 440.0, 5.0, 100000),
+        ("2025-01-13T10:03:00", "DSCOVR", 430.0, 5.0, 100000),
+    ])
+
+    assert [row[1] for row in db.get_recent_solarwind(limit=2)] == ["2025-01-13T10:05:00", "2025-01-13T10:04:00"]
+    assert db.get_latest_solarwind()[2] == 500.0
+
+def test_range_queries_return_only_selected_window(db):
+    db.insert_goes_data_batch([
+        (f"2025-01-13T10:0{minute}:00Z", 16, None, None, None, None, 1e-6, 1e-6, 0.0, False)
+        for minute in range(6)
+    ])
+    ten_am = 1736762400
+    assert db.get_goes_time_bounds() == (ten_am, ten_am + 300)
+
+    goes = db.get_goes_flux_columns(datetime(2025, 1, 13, 10, 2), datetime(2025, 1, 13, 10, 4))
+    assert goes["time_epoch"].tolist() == [ten_am + 120, ten_am + 180, ten_am + 240]
+
+def test_lookups_use_indexes(db):
+    start, end = datetime(2025, 1, 13, 10, 0), datetime(2025, 1, 13, 11, 0)
+    lookups = [
+        lambda: db.check_xray_exists("2025-01-13T10:00:00Z"),
+        db.get_latest_xray_event,
+        lambda: db.check_solarwind_exists("2025-01-13T10:00:00"),
+        lambda: db.get_recent_solarwind(limit=4),
+        db.get_latest_solarwind,
+        db.get_solarwind_time_bounds,
+        lambda: db.get_solarwind_columns(start, end),
+        lambda: db.check_goes_data_exists("2025-01-13T10:00:00Z", 16),
+        db.get_goes_time_bounds,
+        lambda: db.get_goes_flux_columns(start, end),
+        lambda: db.check_image_exists("SOHO LASCO C2", "abc"),
+        db.get_latest_solar_images,
+        lambda: db.get_solar_images_for_sources_in_range("2025-01-13 00:00:00", "2025-01-13 23:59:59",
+                                                         ["SOHO LASCO C2"]),
+        lambda: db.get_high_water_marks("goes_data"),
+    ]
+    tables = {"xray", "solarwind", "goes_data", "solar_images", "ingest_marks"}
+
+    statements = []
+    with db.pool.connection() as conn:
+        conn.set_trace_callback(statements.append)
+    for lookup in lookups:
+        lookup()
+
+    with db.pool.connection() as conn:
+        conn.set_trace_callback(None)
+        assert len(statements) >= len(lookups)
+
+        for sql in statements:
+            for *_, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+                words = detail.split()
+                if words[0] == "SCAN" and words[1] in tables:
+                    assert "USING" in words, f"{detail}\n{sql}"
+
+def test_rollups_follow_each_ingest_batch(db):
+    db.insert_solarwind_batch([
+        (f"2025-01-13T10:0{minute}:00", "DSCOVR", 400.0 + 10 * minute, 5.0, 100000) for minute in range(4)
+    ])
+    db.insert_solarwind_batch([("2025-01-13T10:04:00", "DSCOVR", 600.0, 7.0, 200000)])
+
+    start, end = datetime(2025, 1, 13, 10, 0), datetime(2025, 1, 13, 10, 59)
+    ten_am = 1736762400
+    assert db.get_solarwind_rollup(300, start, end) == [(ten_am, 452.0, 5.4, 120000.0)]
+    assert db.get_solarwind_rollup(3600, start, end, stat="max") == [(ten_am, 600.0, 7.0, 200000)]
+
+    db.insert_goes_data_batch([
+        ("2025-01-13T10:00:00Z", 16, None, None, None, None, 1e-6, 1e-6, 0.0, False),
+        ("2025-01-13T10:06:00Z", 16, None, None, None, None, 5e-5, 5e-5, 0.0, False),
+        ("2025-01-13T10:06:00Z", 18, None, None, None, None, 2e-6, 2e-6, 0.0, False),
+    ])
+    assert db.get_goes_rollup(300, start, end) == [
+        (ten_am, 16, 1e-6, None),
+        (ten_am + 300, 16, 5e-5, None),
+        (ten_am + 300, 18, 2e-6, None),
+    ]
+
+def test_single_row_writers_refresh_rollups(db):
+    db.insert_solarwind("2025-01-13T10:00:00", 400.0, 5.0, 100000)
+    db.insert_goes_data("2025-01-13T10:00:00Z", 16, 1e-6, 1e-6, 0.0, False, "0.1-0.8nm")
+
+    start, end = datetime(2025, 1, 13, 10, 0), datetime(2025, 1, 13, 10, 59)
+    assert db.get_solarwind_rollup(3600, start, end) == [(1736762400, 400.0, 5.0, 100000.0)]
+    assert db.get_goes_rollup(3600, start, end) == [(1736762400, 16, 1e-6, None)]
+    assert db.get_high_water_marks("goes_data") == {"16/long": "2025-01-13T10:00:00Z"}
+
+def test_choose_rollup_resolution():
+    start = datetime(2025, 1, 1)
+    assert DBManager.choose_rollup_resolution(start, start + timedelta(days=2), 4000) is None
+    assert DBManager.choose_rollup_resolution(start, start + timedelta(days=30), 4000) == 3600
+    assert DBManager.choose_rollup_resolution(start, start + timedelta(days=365), 4000) == 86400
+
+def test_solar_images_are_stored_on_disk(db, tmp_path):
+    db.insert_solar_image("SOHO LASCO C2", b"jpeg-1", "aa11", "2025-01-13 10:00:00")
+    db.insert_solar_image("SOHO LASCO C2", b"jpeg-2", "bb22", "2025-01-13 10:12:00")
+
+    [(source, path, time_tag)] = db.get_latest_solar_images()
+    assert (source, time_tag) == ("SOHO LASCO C2", "2025-01-13 10:12:00")
+    assert path == os.path.join(str(tmp_path), "solar_images", "bb", "22", "bb22.jpg")
+    with open(path, "rb") as f:
+        assert f.read() == b"jpeg-2"
+    assert db._fetchone("SELECT length(image) FROM solar_images WHERE image_hash = 'bb22'") == (0,)
+
+def test_move_images_to_store_migrates_existing_blobs(db):
+    with db._transaction() as c:
+        c.execute("""
+            INSERT INTO solar_images (source, image, image_hash, time_tag)
+            VALUES ('SDO HMI Continuum', X'FFD8FFD9', 'cc33', '2025-01-13 09:00:00')
+        """)
+
+    [(_, image, _)] = db.get_latest_solar_images()
+    assert image == b"\xff\xd8\xff\xd9"
+
+    assert db.move_images_to_store() == 1
+    assert db.move_images_to_store() == 0
+
+    [(_, path, _)] = db.get_latest_solar_images()
+    with open(path, "rb") as f:
+        assert f.read() == b"\xff\xd8\xff\xd9"
+
+
+def test_browse_table_pages_by_id_without_blobs(db):
+    db.insert_solarwind_batch([(f"2025-01-12T10:{m:02d}:00", "ACE", 400.0 + m, 5.0, 1e5) for m in range(25)])
+
+    rows, columns = db.browse_table("solarwind", limit=10)
+    assert columns[0] == "id"
+    assert [row[0] for row in rows] == list(range(25, 15, -1))
+
+    older, _ = db.browse_table("solarwind", limit=10, before_id=rows[-1][0])
+    assert [row[0] for row in older] == list(range(15, 5, -1))
+    newer, _ = db.browse_table("solarwind", limit=10, after_id=older[0][0])
+    assert newer == rows
+    assert db.count_rows("solarwind") == 25
+
+    db.insert_solar_image("SOHO LASCO C2", b"jpeg", "hash1", "2025-01-12 10:00:00")
+    image_rows, image_columns = db.browse_table("solar_images")
+    assert "image" not in image_columns and "path" in image_columns
+    assert "image" in db.get_table_columns("solar_images", include_blobs=True)
+
+    with pytest.raises(ValueError):
+        db.browse_table("sqlite_master")
+
+
+def test_browse_table_uses_primary_key_range(db):
+    traced = []
+    with db.pool.connection() as conn:
+        conn.set_trace_callback(traced.append)
+    db.browse_table("goes_data", limit=5, before_id=100)
+    with db.pool.connection() as conn:
+        conn.set_trace_callback(None)
+        sql = next(s for s in traced if "FROM goes_data" in s)
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+    assert "INTEGER PRIMARY KEY (rowid<?)" in plan
+
+
+def test_time_epoch_is_filled_for_every_time_tag_format(db):
+    db.insert_goes_data_batch([("2025-01-13T10:00:00Z", 16, None, None, None, None, 1e-6, 1e-6, 0.0, False)])
+    db.insert_solarwind_batch([("2025-01-13T10:00:00", "DSCOVR", 400.0, 5.0, 100000)])
+    db.insert_xray("2025-01-13T10:00:00Z", 16, "C1.0", 0.1, 0.0, None, None, None, None, None, None, None)
+    db.insert_solar_image("SOHO LASCO C2", b"jpeg", "aa11", "2025-01-13 10:00:00")
+
+    for table in ("goes_data", "solarwind", "xray", "solar_images"):
+        assert db._fetchone(f"SELECT time_epoch FROM {table}") == (1736762400,)
+
+    assert db.get_image_range_signature("2025-01-13 09:00:00", "2025-01-13 10:00:00", "SOHO LASCO C2") == ("aa11", 1)
+
+
+def test_data_versions_change_only_when_rows_are_written(db):
+    before = db.get_data_versions()
+    assert before == {"xray": 0, "solarwind": 0, "goes_data": 0, "solar_images": 0}
+
+    rows = [("2025-01-13T10:00:00", "DSCOVR", 400.0, 5.0, 100000)]
+    db.insert_solarwind_batch(rows)
+    db.insert_solar_image("SOHO LASCO C2", b"jpeg", "aa11", "2025-01-13 10:00:00")
+    after_insert = db.get_data_versions()
+    assert after_insert["solarwind"] == 1 and after_insert["solar_images"] == 1 and after_insert["goes_data"] == 0
+
+    db.insert_solarwind_batch(rows)
+    assert db.get_data_versions() == after_insert
+
+
+def test_columnar_fetch_returns_typed_arrays(db):
+    db.insert_goes_data_batch([
+        ("2025-01-13T10:00:00Z", 16, 3e-7, 3e-7, 0.0, False, 1e-6, 1e-6, 0.0, False),
+        ("2025-01-13T10:00:00Z", 18, None, None, None, None, None, None, 0.0, False),
+        ("2025-01-13T10:01:00Z", 16, None, None, None, None, 2e-6, 2e-6, 0.0, False),
+    ])
+    db.insert_solarwind_batch([(f"2025-01-13T10:0{m}:00", "DSCOVR", 400.0 + m, 5.0, 100000) for m in range(6)])
+    start, end = datetime(2025, 1, 13, 10, 0), datetime(2025, 1, 13, 10, 59)
+
+    goes = db.get_goes_flux_columns(start, end)
+    assert goes["time_epoch"].dtype == np.int64 and goes["satellite"].dtype == np.int8
+    assert goes["flux"].dtype == np.float32 and goes["flux_short"].dtype == np.float32
+    assert goes["time_epoch"].tolist() == [1736762400, 1736762400, 1736762460]
+    assert goes["satellite"].tolist() == [16, 18, 16]
+    assert np.isnan(goes["flux"][1]) and goes["flux"][2] == np.float32(2e-6)
+    assert goes["flux_short"][0] == np.float32(3e-7) and np.isnan(goes["flux_short"][2])
+
+    db.COLUMNAR_CHUNK_ROWS = 4
+    wind = db.get_solarwind_columns(start, end)
+    assert wind["proton_speed"].tolist() == [400.0, 401.0, 402.0, 403.0, 404.0, 405.0]
+    assert wind["proton_temperature"].dtype == np.float32
+
+    rollup = db.get_solarwind_columns(start, end, resolution=300)
+    assert rollup["time_epoch"].tolist() == [1736762400, 1736762700]
+    assert rollup["proton_speed"].tolist() == [402.0, 405.0]
+
+    empty = db.get_goes_flux_columns(datetime(2024, 1, 1), datetime(2024, 1, 2))
+    assert len(empty["flux"]) == 0 and empty["flux"].dtype == np.float32
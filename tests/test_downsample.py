@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from app.downsample import downsample_frame, lttb_indices, minmax_indices
+
+
+def make_series(n=100_000, spike_at=43_210):
+    x = np.arange(n, dtype=np.float64)
+    y = np.sin(x / 500.0)
+    y[spike_at] = 25.0
+    return x, y
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    x, y = make_series()
+    indices = lttb_indices(x, y, 1000)
+
+    assert len(indices) == 1000
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+    assert 43_210 in indices
+
+
+def test_minmax_keeps_extremes_within_budget():
+    x, y = make_series()
+    y[77_777] = -30.0
+    indices = minmax_indices(y, 1000)
+
+    assert len(indices) <= 1000
+    assert 43_210 in indices and 77_777 in indices
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert len(minmax_indices(y, 4001)) <= 4001
+
+
+def test_downsample_frame_per_group_and_short_series_untouched():
+    times = pd.date_range("2025-01-01", periods=20_000, freq="min")
+    df = pd.DataFrame({
+        "time_tag": np.concatenate([times, times]),
+        "flux": np.concatenate([np.linspace(1e-7, 1e-6, 20_000), np.linspace(1e-6, 1e-7, 20_000)]),
+        "satellite": [16] * 20_000 + [18] * 20_000,
+    })
+
+    reduced = downsample_frame(df, "time_tag", "flux", 500, group="satellite")
+    assert reduced.groupby("satellite").size().to_dict() == {16: 500, 18: 500}
+
+    small = df.head(100)
+    assert downsample_frame(small, "time_tag", "flux", 500) is small
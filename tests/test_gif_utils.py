@@ -0,0 +1,66 @@
+from io import BytesIO
+
+from PIL import Image
+
+from app.gif_utils import create_animation_in_memory, create_gif_in_memory, sample_evenly
+
+
+def make_jpeg(color, size=256):
+    buffer = BytesIO()
+    Image.new("RGB", (size, size), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_sample_evenly_keeps_first_and_last():
+    assert sample_evenly(range(100), 5) == [0, 25, 50, 74, 99]
+    assert sample_evenly(range(3), 5) == [0, 1, 2]
+
+
+def test_gif_is_streamed_with_frame_cap_and_size_limit():
+    frames = [make_jpeg((i * 8, 255 - i * 8, 100)) for i in range(30)]
+    frames.insert(10, b"not a jpeg")
+
+    gif = Image.open(create_gif_in_memory(frames, duration_ms=200, max_frames=10, max_size=64))
+
+    assert gif.size == (64, 64)
+    # 10 klatek po próbkowaniu, w tym uszkodzona (pominięta).
+    assert gif.n_frames == 9
+    assert gif.info["duration"] == 200
+    gif.seek(gif.n_frames - 1)
+    red, green, _ = gif.convert("RGB").getpixel((10, 10))
+    assert red > 200 and green < 60
+
+
+def test_gif_needs_two_frames():
+    assert create_gif_in_memory([make_jpeg((0, 0, 0))]) is None
+
+
+def test_parallel_frame_preparation_keeps_order():
+    frames = [make_jpeg((i * 12, 0, 255 - i * 12), size=64) for i in range(20)]
+
+    serial = create_gif_in_memory(frames, max_size=32, workers=1).getvalue()
+    parallel = create_gif_in_memory(frames, max_size=32, workers=2).getvalue()
+
+    assert parallel == serial
+
+
+def test_webp_and_apng_animations():
+    frames = [make_jpeg((i * 20, 100, 255 - i * 20), size=128) for i in range(6)]
+
+    for fmt, pil_format in (("webp", "WEBP"), ("apng", "PNG")):
+        animation = Image.open(create_animation_in_memory(frames, fmt=fmt, duration_ms=300, max_size=64))
+        assert animation.format == pil_format
+        assert animation.size == (64, 64)
+        assert animation.n_frames == 6
+        animation.seek(5)
+        red, _, blue = animation.convert("RGB").getpixel((32, 32))
+        assert red > 80 and blue < 170
+
+    noisy = []
+    for i in range(3):
+        buffer = BytesIO()
+        Image.effect_noise((128, 128), 40 + i).convert("RGB").save(buffer, format="JPEG")
+        noisy.append(buffer.getvalue())
+    lossy = create_animation_in_memory(noisy, fmt="webp", quality=30).getvalue()
+    lossless = create_animation_in_memory(noisy, fmt="webp", lossless=True).getvalue()
+    assert len(lossy) < len(lossless)
@@ -0,0 +1,28 @@
+from io import BytesIO
+
+from PIL import Image
+
+from app.image_store import ImageStore
+
+
+def make_jpeg(size=1024):
+    buffer = BytesIO()
+    Image.new("RGB", (size, size), (200, 80, 20)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_variants_are_generated_once_and_picked_by_size(tmp_path):
+    store = ImageStore(str(tmp_path))
+    data = make_jpeg()
+    path = store.put("abcd1234", data)
+
+    variants = store.put_variants(path, data)
+    assert variants == ["ab/cd/abcd1234_512.jpg", "ab/cd/abcd1234_256.jpg"]
+    for variant, size in zip(variants, (512, 256)):
+        with Image.open(store.absolute_path(variant)) as img:
+            assert img.size == (size, size)
+
+    assert store.best_path(path, 200) == "ab/cd/abcd1234_256.jpg"
+    assert store.best_path(path, 300) == "ab/cd/abcd1234_512.jpg"
+    assert store.best_path(path, 800) == path
+    assert store.best_path(path) == path
@@ -0,0 +1,141 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from PIL import Image
+
+from app.db_manager import DBManager
+from app.ingest import IngestionScheduler, SpaceWeatherIngestor
+from app.utils import time_tag_epoch
+
+
+class FakeIngestor:
+    def __init__(self):
+        self.calls = []
+
+    def fetch_and_save_solarwind(self):
+        self.calls.append("solarwind")
+
+    def fetch_and_save_goes(self):
+        self.calls.append("goes")
+        raise RuntimeError("NOAA niedostępne")
+
+
+def test_scheduler_runs_each_feed_on_its_own_interval():
+    ingestor = FakeIngestor()
+    scheduler = IngestionScheduler(ingestor, intervals={"solarwind": 60, "goes": 120})
+
+    assert scheduler.run_pending(now=1000.0) == 1060.0
+    assert sorted(ingestor.calls) == ["goes", "solarwind"]
+
+    scheduler.run_pending(now=1030.0)
+    assert len(ingestor.calls) == 2
+
+    scheduler.run_pending(now=1060.0)
+    assert sorted(ingestor.calls) == ["goes", "solarwind", "solarwind"]
+
+
+def test_goes_records_of_both_bands_are_saved_as_one_row(tmp_path):
+    db = DBManager(str(tmp_path / "test.db"))
+    record = {"time_tag": "2025-01-13T10:00:00Z", "satellite": 16, "observed_flux": 1e-6,
+              "electron_correction": 0.0, "electron_contaminaton": False}
+    data = [
+        {**record, "flux": 1e-6, "energy": "0.1-0.8nm"},
+        {**record, "flux": 2e-7, "energy": "0.05-0.4nm"},
+        {**record, "satellite": 18, "flux": 3e-6, "energy": "0.1-0.8nm"},
+        {**record, "flux": 5.0, "energy": "unknown"},
+    ]
+
+    ingestor = SpaceWeatherIngestor(db)
+    assert ingestor._save_goes_data(data) == (2, 0, 0)
+    assert ingestor._save_goes_data(data) == (0, 0, 0)
+
+    rows = {row[2]: row for row in db.get_recent_goes_data(limit=None)}
+    assert rows[16][3] == 2e-7 and rows[16][7] == 1e-6
+    assert rows[18][3] is None and rows[18][7] == 3e-6
+
+    # Pasmo krótkie satelity 18 w kolejnym odpytaniu - znacznik długiego pasma go nie odfiltrowuje.
+    late_band = {**record, "satellite": 18, "flux": 4e-7, "energy": "0.05-0.4nm"}
+    assert ingestor._save_goes_data(data + [late_band]) == (0, 1, 0)
+    rows = {row[2]: row for row in db.get_recent_goes_data(limit=None)}
+    assert rows[18][3] == 4e-7 and rows[18][7] == 3e-6
+
+
+class FakeImageFetcher:
+    image_sources = {"SOHO LASCO C2": None}
+
+    def __init__(self):
+        self.images = []
+        self.committed = []
+
+    def fetch_images(self):
+        return self.images
+
+    def commit(self, source_name):
+        self.committed.append(source_name)
+
+
+def make_image(color, time_tag):
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, format="JPEG")
+    data = buffer.getvalue()
+    return {"source": "SOHO LASCO C2", "image_data": data, "image_hash": hashlib.sha256(data).hexdigest(),
+            "time_tag": time_tag}
+
+
+def test_rolling_animation_is_seeded_from_db_then_appended(tmp_path):
+    db = DBManager(str(tmp_path / "test.db"))
+    now = datetime.now()
+    old = make_image((200, 0, 0), (now - timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S"))
+    db.insert_solar_image(old["source"], old["image_data"], old["image_hash"], old["time_tag"])
+
+    ingestor = SpaceWeatherIngestor(db)
+    ingestor.image_fetcher = FakeImageFetcher()
+    ingestor.image_fetcher.images = [make_image((0, 200, 0), now.strftime("%Y-%m-%d %H:%M:%S"))]
+    ingestor.fetch_and_save_solar_images()
+
+    path = ingestor.rolling_animation.animation_path("SOHO LASCO C2")
+    assert Image.open(path).n_frames == 2
+
+    ingestor.image_fetcher.images = [make_image((0, 0, 200), (now + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S"))]
+    ingestor.fetch_and_save_solar_images()
+    assert Image.open(path).n_frames == 3
+
+
+def test_invalid_image_does_not_block_other_sources(tmp_path):
+    db = DBManager(str(tmp_path / "test.db"))
+    ingestor = SpaceWeatherIngestor(db)
+    ingestor.image_fetcher = FakeImageFetcher()
+    ingestor.image_fetcher.image_sources = {"A": None, "SOHO LASCO C2": None}
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    html = b"<html>503 Service Unavailable</html>"
+    good = make_image((0, 200, 0), now)
+    ingestor.image_fetcher.images = [
+        {"source": "A", "image_data": html, "image_hash": hashlib.sha256(html).hexdigest(), "time_tag": now},
+        good,
+    ]
+    ingestor.fetch_and_save_solar_images()
+
+    assert not db.check_image_exists("A", hashlib.sha256(html).hexdigest())
+    assert db.check_image_exists("SOHO LASCO C2", good["image_hash"])
+    assert ingestor.image_fetcher.committed == ["SOHO LASCO C2"]
+    assert os.listdir(db.image_store.root) == [good["image_hash"][:2]]
+    assert Image.open(ingestor.rolling_animation.animation_path("SOHO LASCO C2")).n_frames == 1
+
+
+def test_stale_rolling_animation_expires_without_new_images(tmp_path):
+    db = DBManager(str(tmp_path / "test.db"))
+    ingestor = SpaceWeatherIngestor(db)
+    ingestor.image_fetcher = FakeImageFetcher()
+
+    stale = make_image((200, 0, 0), (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d %H:%M:%S"))
+    ingestor.rolling_animation.add_frame(
+        "SOHO LASCO C2", stale["image_data"], stale["time_tag"], stale["image_hash"],
+        now=time_tag_epoch(stale["time_tag"])
+    )
+    assert ingestor.rolling_animation.animation_path("SOHO LASCO C2")
+
+    ingestor.fetch_and_save_solar_images()
+    assert ingestor.rolling_animation.animation_path("SOHO LASCO C2") is None
@@ -1,3 +1,6 @@
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
 import pytest
 from app.plot import DataPlot
@@ -22,3 +25,73 @@ def test_create_solarwind_table_formatting():
     assert "e" in temp_str.lower()
 
     assert df.iloc[0]["Znacznik czasu"] == "13-01-2025 10:15"
+
+def test_goes_flux_line_plot_is_downsampled(monkeypatch):
+    monkeypatch.setattr(DataPlot, "MAX_PLOT_POINTS", 300)
+    times = pd.date_range("2025-01-01", periods=10_000, freq="min").strftime("%Y-%m-%dT%H:%M:%SZ")
+    df = pd.DataFrame({
+        "time_tag": list(times) * 2,
+        "satellite": [16] * 10_000 + [18] * 10_000,
+        "flux": [1e-6] * 20_000,
+    })
+    df.loc[4321, "flux"] = 1e-3
+
+    fig = DataPlot.create_goes_flux_line_plot(df)
+
+    assert [len(trace.x) for trace in fig.data] == [300, 300]
+    assert max(fig.data[0].y) == 1e-3
+
+
+def test_goes_flux_line_plot_draws_both_bands():
+    df = pd.DataFrame({
+        "time_epoch": [1736762400, 1736762400, 1736762460],
+        "satellite": [16, 18, 16],
+        "flux": [1e-6, 3e-6, 2e-6],
+        "flux_short": [2e-7, None, 3e-7],
+    })
+
+    fig = DataPlot.create_goes_flux_line_plot(df)
+
+    assert sorted((trace.name, len(trace.x)) for trace in fig.data) == [
+        ("16, 0.05-0.4 nm", 2), ("16, 0.1-0.8 nm", 2), ("18, 0.1-0.8 nm", 1)
+    ]
+
+
+def test_format_numbers_is_vectorized_and_keeps_missing_values():
+    df = pd.DataFrame({"flux": [1.234e-6, None, 5e-9], "energy": ["0.1-0.8nm"] * 3})
+
+    DataPlot.format_numbers(df, ["flux", "missing_column"])
+
+    assert df["flux"][0] == "1.23e-06" and df["flux"][2] == "5.00e-09"
+    assert pd.isna(df["flux"][1])
+    assert df["energy"].tolist() == ["0.1-0.8nm"] * 3
+
+
+def test_time_bounds_and_axis_from_epoch_seconds():
+    assert DataPlot.parse_time_bounds((1736762400, 1736766000)) == (
+        datetime(2025, 1, 13, 10, 0), datetime(2025, 1, 13, 11, 0)
+    )
+    times = DataPlot.time_column(pd.DataFrame({"time_epoch": [1736762400, 1736762460]}))
+    assert list(times) == [pd.Timestamp("2025-01-13 10:00:00"), pd.Timestamp("2025-01-13 10:01:00")]
+
+
+def test_solarwind_panel_plot_shares_time_axis(monkeypatch):
+    monkeypatch.setattr(DataPlot, "MAX_PLOT_POINTS", 200)
+    epochs = 1736726400 + 60 * np.arange(5000)
+    df = pd.DataFrame({
+        "time_epoch": epochs[::-1],
+        "proton_speed": np.full(5000, 400.0),
+        "proton_density": np.full(5000, 5.0),
+        "proton_temperature": np.full(5000, 1e5),
+    })
+    df.loc[123, "proton_speed"] = 900.0
+    df.loc[10, "proton_density"] = np.nan
+
+    fig = DataPlot.create_solarwind_panel_plot(df)
+
+    assert [trace.type for trace in fig.data] == ["scattergl"] * 3
+    assert all(len(trace.x) <= 200 for trace in fig.data)
+    assert max(fig.data[0].y) == 900.0
+    assert not np.isnan(fig.data[1].y).any()
+    assert fig.data[0].x[0] < fig.data[0].x[-1]
+    assert fig.layout.xaxis.matches == "x3" or fig.layout.xaxis2.matches == "x3"
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import plotly.graph_objects as go
+
+from app.query_cache import QueryCache
+
+
+def test_lru_eviction_respects_byte_budget():
+    cache = QueryCache(max_bytes=250)
+    cache.get_or_compute("a", lambda: "x" * 100)
+    cache.get_or_compute("b", lambda: "y" * 100)
+    cache.get_or_compute("a", lambda: "changed")
+    cache.get_or_compute("c", lambda: "z" * 100)
+
+    assert cache.total_bytes == 200
+    assert cache.get_or_compute("a", lambda: "recomputed") == "x" * 100
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+    # Wartość większa niż cały budżet nie jest zapamiętywana.
+    assert cache.get_or_compute("big", lambda: "w" * 1000) == "w" * 1000
+    assert len(cache) <= 3 and cache.total_bytes <= 250
+
+
+def test_concurrent_sessions_compute_once():
+    cache = QueryCache()
+    calls = []
+
+    def slow_query():
+        calls.append(1)
+        time.sleep(0.05)
+        return [(1, "2025-01-13T10:00:00", 400.0)]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute(("solarwind", 7), slow_query)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [[(1, "2025-01-13T10:00:00", 400.0)]] * 8
+
+
+def test_figures_are_cached_as_json():
+    cache = QueryCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return go.Figure(go.Scatter(x=[1, 2], y=[3, 4]))
+
+    first = cache.figure("gauge", build)
+    second = cache.figure("gauge", build)
+
+    assert len(builds) == 1
+    assert first == second and first["data"][0]["y"] == [3, 4]
+    assert cache.figure("empty", lambda: None) is None
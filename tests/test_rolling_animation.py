@@ -0,0 +1,72 @@
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from app.rolling_animation import RollingAnimation
+from app.utils import time_tag_epoch
+
+
+def make_jpeg(color, size=128):
+    buffer = BytesIO()
+    Image.new("RGB", (size, size), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_rolling_animation_appends_and_expires_frames(tmp_path):
+    rolling = RollingAnimation(str(tmp_path), window_seconds=3600, frame_size=64, duration_ms=100)
+    source = "SOHO LASCO C2"
+    assert rolling.animation_path(source) is None
+
+    colors = [(250, 0, 0), (0, 250, 0), (0, 0, 250)]
+    ten_am = time_tag_epoch("2025-01-12 10:00:00")
+    assert rolling.add_frames(source, [
+        (make_jpeg(color), f"2025-01-12 10:{i * 20:02d}:00", f"hash{i}") for i, color in enumerate(colors)
+    ], now=ten_am + 2400) == 3
+
+    segments = sorted(os.listdir(rolling.source_dir(source)))
+    encoded = {name: os.path.getmtime(os.path.join(rolling.source_dir(source), name)) for name in segments}
+
+    # Nowa klatka po godzinie wypycha najstarszą; pozostałe segmenty nie są kodowane ponownie.
+    assert rolling.add_frame(source, make_jpeg((255, 255, 255)), "2025-01-12 11:00:00", "hash3",
+                             now=ten_am + 3600) == 3
+    for name, mtime in encoded.items():
+        if name.endswith(".frame") and not name.endswith("hash0.frame"):
+            assert os.path.getmtime(os.path.join(rolling.source_dir(source), name)) == mtime
+
+    gif = Image.open(rolling.animation_path(source))
+    assert gif.size == (64, 64)
+    assert gif.n_frames == 3
+    assert gif.info["duration"] == 100
+    expected = [(0, 250, 0), (0, 0, 250), (255, 255, 255)]
+    for index, color in enumerate(expected):
+        gif.seek(index)
+        pixel = gif.convert("RGB").getpixel((32, 32))
+        assert all(abs(a - b) < 20 for a, b in zip(pixel, color))
+
+
+def test_duplicate_frame_is_not_encoded_twice(tmp_path):
+    rolling = RollingAnimation(str(tmp_path), frame_size=32)
+    now = time_tag_epoch("2025-01-12 10:05:00")
+    rolling.add_frame("SDO HMI Continuum", make_jpeg((10, 10, 10)), "2025-01-12 10:00:00", "abc", now=now)
+    rolling.add_frame("SDO HMI Continuum", make_jpeg((10, 10, 10)), "2025-01-12 10:00:00", "abc", now=now)
+
+    assert rolling.has_frames("SDO HMI Continuum")
+    assert Image.open(rolling.animation_path("SDO HMI Continuum")).n_frames == 1
+
+
+def test_window_is_measured_from_current_time_when_source_stops(tmp_path):
+    rolling = RollingAnimation(str(tmp_path), window_seconds=3600, frame_size=32)
+    source = "SOHO LASCO C3"
+    ten_am = time_tag_epoch("2025-01-12 10:00:00")
+    rolling.add_frames(source, [
+        (make_jpeg((200, 0, 0)), "2025-01-12 10:00:00", "old"),
+        (make_jpeg((0, 200, 0)), "2025-01-12 10:30:00", "new"),
+    ], now=ten_am + 1800)
+
+    assert rolling.expire(source, now=ten_am + 3000) == 2
+    assert rolling.expire(source, now=ten_am + 4000) == 1
+    assert Image.open(rolling.animation_path(source)).n_frames == 1
+
+    assert rolling.expire(source, now=ten_am + 86400) == 0
+    assert rolling.animation_path(source) is None and not rolling.has_frames(source)